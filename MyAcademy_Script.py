@@ -1,52 +1,328 @@
-import pywhatkit as pwk
+import contextlib
+import csv
 import datetime
+import hashlib
+import json
+import mmap
 import os
 import shutil
-import pandas as pd
+import sqlite3
+import struct
+import sys
+import threading
+import time
+import zlib
+from bisect import bisect_left
 
 STUDENT_FILE = "students.txt"
 STATS_FILE = "master_attendance.txt"
+COUNTER_FILE = "master_attendance.bin"
 DAILY_DIR = "daily_attendance"
+ATTENDANCE_DB = "attendance.db"
+ARCHIVE_DIR = "archive"
 BACKUP_DIR = "backups"
 DELETED_STUDENTS_FILE = "deleted_students.txt"
+OUTBOX_FILE = "outbox.jsonl"
+SENDER_LOCK_FILE = "sender.lock"
+JOURNAL_FILE = "pending_commit.json"
+FAILED_JOURNAL_FILE = "failed_commit.json"
+LOCK_FILE = "attendance.lock"
+SNAPSHOT_DIR = os.path.join(BACKUP_DIR, "snapshots")
+OBJECT_DIR = os.path.join(BACKUP_DIR, "objects")
+SNAPSHOT_CHUNK_SIZE = 64 * 1024
+SENT_MESSAGES_FILE = "sent_messages.txt"
+
+# Column of each status in a master stats record [name, presents, absents, leaves]
+STATUS_COLUMNS = {"P": 1, "A": 2, "L": 3}
+
+# Notification dispatch settings (sender can be overridden with ACADEMY_SENDER=file)
+NOTIFY_SENDER = os.environ.get("ACADEMY_SENDER", "pywhatkit")
+NOTIFY_WORKERS = 1
+NOTIFY_MIN_INTERVAL = 5
+NOTIFY_RETRY_BASE = 30
+NOTIFY_RETRY_MAX = 1800
+NOTIFY_MAX_ATTEMPTS = 5
+NOTIFY_CLAIM_SECONDS = 300
+NOTIFY_POLL_INTERVAL = 30
+
+# Opt-in instrumentation of menu actions (ACADEMY_METRICS=1; ACADEMY_PROFILE=<fraction of calls to profile>)
+METRICS_ENABLED = os.environ.get("ACADEMY_METRICS", "0") not in ("", "0")
+PROFILE_RATE = float(os.environ.get("ACADEMY_PROFILE", "0") or 0)
+METRICS_FILE = "metrics.jsonl"
+METRICS_MAX_BYTES = 1024 * 1024
+METRICS_BACKUPS = 3
+PROFILE_DIR = "profiles"
+
+# Background maintenance (ACADEMY_MAINTENANCE=0 turns the scheduler off inside main())
+MAINTENANCE_ENABLED = os.environ.get("ACADEMY_MAINTENANCE", "1") not in ("", "0")
+MAINTENANCE_CONFIG_FILE = "maintenance.json"
+MAINTENANCE_HISTORY_FILE = "maintenance_history.jsonl"
+MAINTENANCE_HISTORY_KEEP = 1000
+MAINTENANCE_POLL = 30
+MAINTENANCE_IDLE = 120
+EXPORT_DIR = "exports"
+
+# Lines read from the text data files, sampled before and after each instrumented action
+_io_stats = {"lines_parsed": 0}
+
+# --- Advisory lock around every change to the data files (shared by all terminals) ---
+if os.name == "nt":
+    import msvcrt
+
+    def _lock_file(handle, blocking):
+        handle.seek(0)
+        while True:
+            try:
+                msvcrt.locking(handle.fileno(), msvcrt.LK_NBLCK, 1)
+                return True
+            except OSError:
+                if not blocking:
+                    return False
+                time.sleep(0.05)
+
+    def _unlock_file(handle):
+        handle.seek(0)
+        msvcrt.locking(handle.fileno(), msvcrt.LK_UNLCK, 1)
+else:
+    import fcntl
+
+    def _lock_file(handle, blocking):
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except BlockingIOError:
+            return False
+
+    def _unlock_file(handle):
+        fcntl.flock(handle, fcntl.LOCK_UN)
+
+_lock_state = threading.local()
+_process_lock = threading.Lock()
+
+@contextlib.contextmanager
+def data_lock(blocking=True):
+    # Re-entrant within a thread; other threads and other processes wait, or with
+    # blocking=False get False instead of the lock (background jobs just try again later)
+    if getattr(_lock_state, "depth", 0):
+        _lock_state.depth += 1
+        try:
+            yield True
+        finally:
+            _lock_state.depth -= 1
+        return
 
-# --- Load existing students from file ---
-def load_students():
-    students = []
-    if not os.path.exists(STUDENT_FILE):
-        return students
-    
-    deleted_students = []
+    if not _process_lock.acquire(blocking):
+        yield False
+        return
+    try:
+        with open(LOCK_FILE, "a+") as handle:
+            if not _lock_file(handle, blocking):
+                yield False
+                return
+            _lock_state.depth = 1
+            try:
+                yield True
+            finally:
+                _lock_state.depth = 0
+                _unlock_file(handle)
+    finally:
+        _process_lock.release()
+
+# --- Student registry (loaded once, reloaded only when the files change) ---
+_registry = {"signature": None, "students": [], "by_reg": {}, "by_name": {}, "deleted": set()}
+
+def _file_signature(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+def get_registry():
+    signature = (_file_signature(STUDENT_FILE), _file_signature(DELETED_STUDENTS_FILE))
+    if signature == _registry["signature"]:
+        return _registry
+
+    # deleted_students.txt holds registration numbers; files written by older versions hold names
+    tombstones = set()
     if os.path.exists(DELETED_STUDENTS_FILE):
         with open(DELETED_STUDENTS_FILE, "r") as file:
-            deleted_students = [line.strip().lower() for line in file]
+            lines = file.readlines()
+        tombstones = {line.strip().lower() for line in lines if line.strip()}
+        _io_stats["lines_parsed"] += len(lines)
 
-    with open(STUDENT_FILE, "r") as file:
-        for line in file:
-            parts = line.strip().split(",")
-            if len(parts) == 5:
-                name, phone, grade, reg_num, joining_date = parts
-                if name.lower() not in deleted_students:
-                    students.append((name, phone, grade, reg_num, joining_date))
-    return students
+    students = []
+    by_reg = {}
+    by_name = {}
+    deleted_students = set()
+    all_regs = set()
+    if os.path.exists(STUDENT_FILE):
+        with open(STUDENT_FILE, "r") as file:
+            for line in file:
+                _io_stats["lines_parsed"] += 1
+                parts = line.strip().split(",")
+                if len(parts) == 5:
+                    name, phone, grade, reg_num, joining_date = parts
+                    all_regs.add(reg_num.lower())
+                    if reg_num.lower() in tombstones or name.lower() in tombstones:
+                        deleted_students.add(name.lower())
+                    else:
+                        student = (name, phone, grade, reg_num, joining_date)
+                        students.append(student)
+                        by_reg[reg_num] = student
+                        by_name.setdefault(name.lower(), student)
+    # names whose attendance rows are hidden: deleted students that no active student shares a name with
+    deleted_students = (deleted_students | (tombstones - all_regs)) - set(by_name)
+
+    _registry.update(signature=signature, students=students, by_reg=by_reg,
+                     by_name=by_name, deleted=deleted_students)
+    return _registry
+
+# --- Load existing students from file ---
+def load_students():
+    return get_registry()["students"]
+
+def find_student(name):
+    return get_registry()["by_name"].get(name.strip().lower())
+
+# Grades are stored as typed ("05" from an imported roster, "5" from the menu), so numeric grades compare as numbers
+def grade_key(grade):
+    grade = grade.strip()
+    return str(int(grade)) if grade.isdigit() else grade.lower()
+
+def same_grade(a, b):
+    return grade_key(a) == grade_key(b)
+
+# --- Student search: sorted prefix keys plus a trigram index for typos ---
+SEARCH_LIMIT = 10
+SEARCH_MIN_SCORE = 0.3
+_search_index = {"signature": None, "keys": [], "exact": {}, "grams": {}, "gram_counts": []}
+
+def _trigrams(text):
+    text = f"  {text} "
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+def get_search_index():
+    registry = get_registry()
+    if _search_index["signature"] == registry["signature"]:
+        return _search_index
+
+    keys = []
+    exact = {}
+    grams = {}
+    gram_counts = []
+    for i, (name, _, _, reg_num, _) in enumerate(registry["students"]):
+        name = name.lower()
+        # every word of the name is a prefix key, so "khan" finds "Ali Khan"
+        for key in {name, reg_num.lower(), *name.split()}:
+            keys.append((key, i))
+        for key in {name, reg_num.lower()}:
+            exact.setdefault(key, []).append(i)
+        student_grams = _trigrams(name)
+        for gram in student_grams:
+            grams.setdefault(gram, []).append(i)
+        gram_counts.append(len(student_grams))
+    keys.sort()
+
+    _search_index.update(signature=registry["signature"], keys=keys, exact=exact, grams=grams, gram_counts=gram_counts)
+    return _search_index
+
+def search_students(query, limit=SEARCH_LIMIT):
+    query = " ".join(query.strip().lower().split())
+    if not query:
+        return []
+    students = get_registry()["students"]
+    index = get_search_index()
+    keys = index["keys"]
+
+    # exact name/registration matches first, then prefix matches in key order
+    matches = list(index["exact"].get(query, []))
+    ranked = set(matches)
+    position = bisect_left(keys, (query, -1))
+    while position < len(keys) and len(matches) < limit and keys[position][0].startswith(query):
+        i = keys[position][1]
+        if i not in ranked:
+            ranked.add(i)
+            matches.append(i)
+        position += 1
+
+    if len(matches) < limit:
+        # fall back to trigram similarity for misspelt names
+        query_grams = _trigrams(query)
+        shared = {}
+        for gram in query_grams:
+            for i in index["grams"].get(gram, ()):
+                shared[i] = shared.get(i, 0) + 1
+        scored = []
+        for i, count in shared.items():
+            if i not in ranked:
+                score = count / (len(query_grams) + index["gram_counts"][i] - count)
+                if score >= SEARCH_MIN_SCORE:
+                    scored.append((-score, students[i][0].lower(), i))
+        matches += [i for _, _, i in sorted(scored)]
+
+    return [students[i] for i in matches[:limit]]
+
+def choose_student(query, allowed=None):
+    matches = search_students(query, limit=SEARCH_LIMIT if allowed is None else len(get_registry()["students"]))
+    if allowed is not None:
+        matches = [student for student in matches if student[0].lower() in allowed][:SEARCH_LIMIT]
+    if not matches:
+        return None
+
+    lowered = query.strip().lower()
+    exact = [student for student in matches if lowered in (student[0].lower(), student[3].lower())]
+    if len(matches) == 1 or len(exact) == 1:
+        return exact[0] if exact else matches[0]
+
+    print("\nMatching students:")
+    for i, student in enumerate(matches):
+        print(f"{i + 1}. {student[0]} (Grade {student[2]}, Reg: {student[3]})")
+    choice = input("Select a student number (leave blank to cancel): ").strip()
+    if choice.isdigit() and 1 <= int(choice) <= len(matches):
+        return matches[int(choice) - 1]
+    return None
+
+# --- Registration numbers: MA<yy><grade><sequence>, one persisted counter per year and grade ---
+def _seed_reg_sequences(conn):
+    last = {}
+    if os.path.exists(STUDENT_FILE):
+        with open(STUDENT_FILE, "r") as file:
+            for line in file:
+                parts = line.strip().split(",")
+                if len(parts) == 5 and parts[3][:2] == "MA" and parts[3][6:].isdigit():
+                    prefix = (parts[3][2:4], parts[3][4:6])
+                    last[prefix] = max(last.get(prefix, 0), int(parts[3][6:]))
+    conn.executemany("INSERT OR IGNORE INTO reg_sequence (year, grade, last) VALUES (?, ?, ?)",
+                     [(year, grade, n) for (year, grade), n in last.items()])
+    conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('reg_sequence_seeded', '1')")
+
+def allocate_reg_numbers(grade, count, year=None):
+    year = f"{(year or datetime.date.today().year) % 100:02}"
+    grade_str = f"{int(grade):02}"
+    conn = get_db()
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        if not conn.execute("SELECT 1 FROM meta WHERE key = 'reg_sequence_seeded'").fetchone():
+            _seed_reg_sequences(conn)
+        row = conn.execute("SELECT last FROM reg_sequence WHERE year = ? AND grade = ?", (year, grade_str)).fetchone()
+        first = (row[0] if row else 0) + 1
+        conn.execute("INSERT OR REPLACE INTO reg_sequence (year, grade, last) VALUES (?, ?, ?)",
+                     (year, grade_str, first + count - 1))
+    # The sequence keeps two digits minimum and simply widens past 99
+    return [f"MA{year}{grade_str}{n:02}" for n in range(first, first + count)]
 
 # --- Add new students to the file ---
 def add_student():
     while True:
         grade = input("Enter student grade: ").strip()
         name = input("Enter student name: ").title()
+        while not name_fits(name):
+            print(f"That name is too long to store (at most {COUNTER_NAME_SIZE} bytes). Please shorten it.")
+            name = input("Enter student name: ").title()
         phone = input("Enter parent's phone number: ")
 
-        # Count total students from file to ensure unique registration numbers
-        total_students = 0
-        if os.path.exists(STUDENT_FILE):
-            with open(STUDENT_FILE, "r") as file:
-                total_students = len(file.readlines())
-
-        reg_number = total_students + 1
-        year = str(datetime.date.today().year)[-2:]
-        grade_str = f"{int(grade):02}"
-        registration_number = f"MA{year}{grade_str}{reg_number:02}"
+        registration_number = allocate_reg_numbers(grade, 1)[0]
 
         use_custom = input("Do you want to enter a custom joining date? (Y/N): ").strip().upper()
         if use_custom == "Y":
@@ -61,16 +337,85 @@ def add_student():
         else:
             joining_date = datetime.date.today().isoformat()
 
-        with open(STUDENT_FILE, "a") as file:
-            file.write(f"{name},{phone},{grade},{registration_number},{joining_date}\n")
+        with data_lock():
+            with open(STUDENT_FILE, "a") as file:
+                file.write(f"{name},{phone},{grade},{registration_number},{joining_date}\n")
 
-        with open(STATS_FILE, "a") as file:
-            file.write(f"{name},0,0,0\n")
+            add_counters([(registration_number, name, 0, 0, 0)])
 
         cont = input("Do you want to add another student? (y/n): ").lower()
         if cont != 'y':
             break
 
+# --- Bulk enrollment from a CSV or Excel roster (name, grade, phone[, joining_date]) ---
+def read_roster(path):
+    if path.lower().endswith((".xlsx", ".xls")):
+        import pandas as pd
+
+        return pd.read_excel(path, header=None, dtype=str).fillna("").values.tolist()
+    with open(path, "r", newline="") as file:
+        return list(csv.reader(file))
+
+def import_students(path):
+    today = datetime.date.today().isoformat()
+    active_names = set(get_registry()["by_name"])
+    students = []
+    errors = []
+
+    for line_number, row in enumerate(read_roster(path), start=1):
+        row = [str(cell).strip() for cell in row] + ["", "", "", ""]
+        if not any(row) or (line_number == 1 and row[0].lower() == "name"):
+            continue
+        name, grade, phone, joining_date = row[0].title(), row[1], row[2], row[3] or today
+        if not name or "," in name:
+            errors.append(f"Row {line_number}: invalid name '{row[0]}'.")
+        elif not name_fits(name):
+            errors.append(f"Row {line_number}: name '{name}' is too long (at most {COUNTER_NAME_SIZE} bytes).")
+        elif name.lower() in active_names:
+            errors.append(f"Row {line_number}: '{name}' is already enrolled.")
+        if not grade.isdigit() or not 0 < int(grade) < 100:
+            errors.append(f"Row {line_number}: invalid grade '{grade}'.")
+        if not phone or "," in phone:
+            errors.append(f"Row {line_number}: invalid phone number '{phone}'.")
+        try:
+            joining_date = normalize_date(joining_date)
+        except ValueError:
+            errors.append(f"Row {line_number}: invalid joining date '{joining_date}'. Use YYYY-MM-DD.")
+        active_names.add(name.lower())
+        students.append((name, phone, grade, joining_date))
+
+    if errors:
+        return 0, errors
+
+    by_grade = {}
+    for student in students:
+        by_grade.setdefault(student[2], []).append(student)
+    student_lines = []
+    counters = []
+    for grade, group in by_grade.items():
+        for (name, phone, grade, joining_date), reg_num in zip(group, allocate_reg_numbers(grade, len(group))):
+            student_lines.append(f"{name},{phone},{grade},{reg_num},{joining_date}\n")
+            counters.append((reg_num, name, 0, 0, 0))
+
+    with data_lock():
+        with open(STUDENT_FILE, "a") as file:
+            file.writelines(student_lines)
+        add_counters(counters)
+    return len(student_lines), []
+
+def import_students_menu():
+    path = input("Enter the path of the CSV or Excel roster (columns: name, grade, phone, joining date): ").strip()
+    if not os.path.exists(path):
+        print("File not found.")
+        return
+    imported, errors = import_students(path)
+    if errors:
+        print(f"Nothing was imported. Fix these {len(errors)} problem(s) and try again:")
+        for error in errors:
+            print(f"- {error}")
+    else:
+        print(f"{imported} student(s) imported successfully.")
+
 def delete_student():
     students = load_students()
     if not students:
@@ -85,8 +430,8 @@ def delete_student():
         choice = int(input("Enter the number of the student to delete: ")) - 1
         if 0 <= choice < len(students):
             student_to_delete = students[choice][0]
-            with open(DELETED_STUDENTS_FILE, "a") as file:
-                file.write(f"{student_to_delete}\n")
+            with data_lock(), open(DELETED_STUDENTS_FILE, "a") as file:
+                file.write(f"{students[choice][3]}\n")
             print(f"Student '{student_to_delete}' marked as deleted. Their records are kept, but they will not appear in future attendance or reports.")
         else:
             print("Invalid choice.")
@@ -96,49 +441,1135 @@ def delete_student():
 # --- View student attendance stats ---
 def view_student_stats():
     while True:
-        student_name = input("Enter the student's name: ").strip()
+        student_name = input("Enter the student's name or registration number: ").strip()
+
+        student = choose_student(student_name)
+        name = student[0] if student else student_name
+        record = get_master_stats([name]).get(name.lower())
+        if record:
+            name, p, a, l = record
+            total_classes = p + a + l
+            percentage = (p / (total_classes - l)) * 100 if total_classes > 0 else 0
+
+            if student:
+                registration_number, grade, joining_date = student[3], student[2], student[4]
+            else:
+                registration_number = grade = joining_date = "N/A"
+
+            print(f"\nStats for {name}:")
+            print(f"Registration Number: {registration_number}")
+            print(f"Grade: {grade}")
+            print(f"Joining Date: {joining_date}")
+            print(f"Total Classes: {total_classes}")
+            print(f"Total Presents: {p}")
+            print(f"Total Leaves: {l}")
+            print(f"Total Absents: {a}")
+            print(f"Attendance Percentage: {percentage:.2f}%")
+        else:
+            print(f"No record found for {student_name}.")
+
+        continue_check = input("\nDo you want to check another student's record? (y/n): ").lower()
+        if continue_check != 'y':
+            break
+
+# --- Message senders ---
+# pywhatkit and pandas are imported where they are used: both are slow to import
+# and most menu operations never need them.
+def pywhatkit_sender(phone_number, message):
+    import pywhatkit as pwk
+
+    pwk.sendwhatmsg_instantly(phone_number, message, wait_time=15, tab_close=True, close_time=3)
+
+def file_sender(phone_number, message):
+    with open(SENT_MESSAGES_FILE, "a") as file:
+        file.write(json.dumps({"phone": phone_number, "message": message, "sent_at": time.time()}) + "\n")
+
+MESSAGE_SENDERS = {"pywhatkit": pywhatkit_sender, "file": file_sender}
+
+# --- Notification outbox (persisted, drained by background workers) ---
+# Several terminals share outbox.jsonl: every read-modify-write reloads it under the
+# data lock, and a worker claims a message in the file before sending it, so no other
+# process sends it too. A claim left by a process that died runs out after
+# NOTIFY_CLAIM_SECONDS and the message is picked up again.
+_outbox = {}
+_outbox_lock = threading.Condition()
+_notifier = {"workers": [], "sender": None, "wakeups": 0}
+
+def _load_outbox():
+    _outbox.clear()
+    if os.path.exists(OUTBOX_FILE):
+        with open(OUTBOX_FILE, "r") as file:
+            for line in file:
+                _io_stats["lines_parsed"] += 1
+                if line.strip():
+                    entry = json.loads(line)
+                    entry.setdefault("claimed_until", 0)
+                    _outbox[entry["id"]] = entry
+
+def _save_outbox():
+    temp_path = OUTBOX_FILE + ".tmp"
+    with open(temp_path, "w") as file:
+        for entry in _outbox.values():
+            file.write(json.dumps(entry) + "\n")
+    os.replace(temp_path, OUTBOX_FILE)
+
+def _wake_workers():
+    _notifier["wakeups"] += 1
+    _outbox_lock.notify_all()
+
+def _next_due_message():
+    now = time.time()
+    due = [e for e in _outbox.values()
+           if e["claimed_until"] <= now and e["attempts"] < NOTIFY_MAX_ATTEMPTS and e["next_attempt"] <= now]
+    return min(due, key=lambda e: e["next_attempt"]) if due else None
+
+def _seconds_until_next_message():
+    waiting = [max(e["next_attempt"], e["claimed_until"]) for e in _outbox.values()
+               if e["attempts"] < NOTIFY_MAX_ATTEMPTS]
+    delay = max(0.0, min(waiting) - time.time()) if waiting else NOTIFY_POLL_INTERVAL
+    return min(delay, NOTIFY_POLL_INTERVAL)
+
+def _claim_next_message():
+    # Returns (entry, None) with the entry claimed in the file, or (None, seconds to wait)
+    with data_lock(), _outbox_lock:
+        _load_outbox()
+        entry = _next_due_message()
+        if entry is None:
+            return None, _seconds_until_next_message()
+        entry["claimed_until"] = time.time() + NOTIFY_CLAIM_SECONDS
+        _save_outbox()
+        return dict(entry), None
+
+# Only one worker in any terminal sends at a time (pywhatkit drives a single browser). The lock
+# file also holds the time of the last send, so NOTIFY_MIN_INTERVAL is kept across terminals.
+# Yields None while another worker has the turn.
+@contextlib.contextmanager
+def _sender_turn():
+    with os.fdopen(os.open(SENDER_LOCK_FILE, os.O_RDWR | os.O_CREAT), "r+") as handle:
+        if not _lock_file(handle, blocking=False):
+            yield None
+            return
+        try:
+            handle.seek(0)
+            turn = {"last_send": float(handle.read(24).strip("\0 ") or 0), "sent": False}
+            yield turn
+            if turn["sent"]:
+                handle.seek(0)
+                handle.write(f"{time.time():<24.6f}")
+                handle.flush()
+        finally:
+            _unlock_file(handle)
+
+def _notification_worker():
+    while True:
+        with _outbox_lock:
+            wakeups = _notifier["wakeups"]
+        entry, delay, error = None, NOTIFY_MIN_INTERVAL, None
+        with _sender_turn() as turn:
+            if turn is not None:
+                entry, delay = _claim_next_message()
+            if entry is not None:
+                time.sleep(max(0.0, turn["last_send"] + NOTIFY_MIN_INTERVAL - time.time()))
+                try:
+                    _notifier["sender"](entry["phone"], entry["message"])
+                except Exception as e:
+                    error = str(e)
+                turn["sent"] = True
+        if entry is None:
+            with _outbox_lock:
+                if _notifier["wakeups"] == wakeups:
+                    _outbox_lock.wait(delay)
+            continue
+
+        with data_lock(), _outbox_lock:
+            _load_outbox()
+            current = _outbox.get(entry["id"])
+            if current is not None:
+                if error is None:
+                    del _outbox[entry["id"]]
+                else:
+                    current["attempts"] = entry["attempts"] + 1
+                    current["last_error"] = error
+                    current["next_attempt"] = time.time() + min(NOTIFY_RETRY_MAX, NOTIFY_RETRY_BASE * 2 ** entry["attempts"])
+                    current["claimed_until"] = 0
+                _save_outbox()
+            _wake_workers()
+
+def start_notifier(sender=None):
+    with _outbox_lock:
+        if _notifier["workers"]:
+            if sender is not None:
+                _notifier["sender"] = sender
+            return
+        _notifier["sender"] = sender or MESSAGE_SENDERS[NOTIFY_SENDER]
+        for _ in range(NOTIFY_WORKERS):
+            worker = threading.Thread(target=_notification_worker, daemon=True)
+            worker.start()
+            _notifier["workers"].append(worker)
+
+def queue_message(message_id, name, phone_number, message):
+    start_notifier()
+    with data_lock(), _outbox_lock:
+        _load_outbox()
+        if message_id not in _outbox:
+            _outbox[message_id] = {"id": message_id, "name": name, "phone": phone_number, "message": message,
+                                   "attempts": 0, "next_attempt": time.time(), "last_error": None, "claimed_until": 0}
+            _save_outbox()
+            _wake_workers()
+
+def pending_notifications():
+    with data_lock(), _outbox_lock:
+        _load_outbox()
+        return [dict(e) for e in _outbox.values()]
+
+def retry_notifications_now():
+    with data_lock(), _outbox_lock:
+        _load_outbox()
+        for entry in _outbox.values():
+            if entry["attempts"] >= NOTIFY_MAX_ATTEMPTS:
+                entry["attempts"] = 0
+            entry["next_attempt"] = time.time()
+        _save_outbox()
+        _wake_workers()
+
+# --- View queued and failed WhatsApp messages ---
+def view_notifications():
+    start_notifier()
+    while True:
+        entries = pending_notifications()
+        failed = [e for e in entries if e["attempts"] >= NOTIFY_MAX_ATTEMPTS]
+        print(f"\nQueued messages: {len(entries) - len(failed)}, failed: {len(failed)}")
+        for entry in entries:
+            state = "failed" if entry["attempts"] >= NOTIFY_MAX_ATTEMPTS else f"attempt {entry['attempts'] + 1}"
+            error = f" - last error: {entry['last_error']}" if entry["last_error"] else ""
+            print(f"{entry['name']} ({entry['phone']}): {state}{error}")
+
+        print("\n1. Retry queued and failed messages now")
+        print("2. Refresh")
+        print("3. Back to Main Menu")
+        sub_choice = input("Choose an option: ").strip()
+        if sub_choice == '1':
+            retry_notifications_now()
+            print("Messages queued for sending.")
+        elif sub_choice == '2':
+            continue
+        elif sub_choice == '3':
+            break
+        else:
+            print("Invalid choice. Please enter a number between 1 and 3.")
+
+# --- Attendance store: one SQLite table of (date, student, status), indexed by date and student ---
+_db_local = threading.local()
+
+def _db_identity(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_dev, stat.st_ino)
+
+def get_db():
+    path = os.path.abspath(ATTENDANCE_DB)
+    identity = _db_identity(path)
+    # a restore replaces the file, so a connection to the old inode must be reopened
+    if getattr(_db_local, "path", None) != path or identity is None or _db_local.identity != identity:
+        close_db()
+        conn = sqlite3.connect(path, timeout=30)
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS attendance (
+                date TEXT NOT NULL,
+                name TEXT NOT NULL COLLATE NOCASE,
+                status TEXT NOT NULL,
+                PRIMARY KEY (date, name)
+            );
+            CREATE INDEX IF NOT EXISTS attendance_by_name ON attendance (name, date);
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+            CREATE TABLE IF NOT EXISTS student_index (
+                reg_num TEXT NOT NULL,
+                date TEXT NOT NULL,
+                status TEXT NOT NULL,
+                PRIMARY KEY (reg_num, date)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS monthly_rollup (
+                month TEXT NOT NULL,
+                name TEXT NOT NULL COLLATE NOCASE,
+                presents INTEGER NOT NULL,
+                absents INTEGER NOT NULL,
+                leaves INTEGER NOT NULL,
+                PRIMARY KEY (month, name)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS rollup_months (month TEXT PRIMARY KEY, built_at TEXT);
+            CREATE TABLE IF NOT EXISTS reg_sequence (
+                year TEXT NOT NULL,
+                grade TEXT NOT NULL,
+                last INTEGER NOT NULL,
+                PRIMARY KEY (year, grade)
+            );
+            CREATE TABLE IF NOT EXISTS archive_files (file TEXT PRIMARY KEY, kind TEXT NOT NULL, created TEXT NOT NULL);
+            CREATE TABLE IF NOT EXISTS archive_students (
+                reg_num TEXT NOT NULL,
+                name TEXT NOT NULL COLLATE NOCASE,
+                file TEXT NOT NULL,
+                PRIMARY KEY (reg_num, name, file)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS archive_students_by_name ON archive_students (name);
+            CREATE TABLE IF NOT EXISTS archive_totals (
+                name TEXT PRIMARY KEY COLLATE NOCASE,
+                presents INTEGER NOT NULL,
+                absents INTEGER NOT NULL,
+                leaves INTEGER NOT NULL
+            );
+        """)
+        _db_local.path, _db_local.conn, _db_local.identity = path, conn, _db_identity(path)
+        migrate_daily_files(conn)
+        if not conn.execute("SELECT 1 FROM meta WHERE key = 'student_index_built'").fetchone():
+            rebuild_student_index(conn)
+    return _db_local.conn
+
+def close_db():
+    if getattr(_db_local, "path", None) is not None:
+        _db_local.conn.close()
+        _db_local.path = _db_local.conn = None
+
+def normalize_date(value):
+    return datetime.datetime.strptime(value.strip(), "%Y-%m-%d").date().isoformat()
+
+# One-time import of the old daily_attendance/<date>.txt files (left in place afterwards)
+def migrate_daily_files(conn):
+    if conn.execute("SELECT 1 FROM meta WHERE key = 'daily_migrated'").fetchone():
+        return
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        if conn.execute("SELECT 1 FROM meta WHERE key = 'daily_migrated'").fetchone():
+            return
+        if os.path.isdir(DAILY_DIR):
+            for filename in sorted(os.listdir(DAILY_DIR)):
+                if not filename.endswith(".txt"):
+                    continue
+                try:
+                    date = normalize_date(filename[:-4])
+                except ValueError:
+                    continue
+                with open(os.path.join(DAILY_DIR, filename), "r") as file:
+                    rows = [line.strip().split(",") for line in file]
+                _io_stats["lines_parsed"] += len(rows)
+                conn.executemany(
+                    "INSERT OR REPLACE INTO attendance (date, name, status) VALUES (?, ?, ?)",
+                    [(date, parts[0].strip(), parts[1].strip().upper()) for parts in rows if len(parts) == 2])
+        conn.execute("INSERT INTO meta (key, value) VALUES ('daily_migrated', ?)", (datetime.datetime.now().isoformat(),))
+
+# --- Per-student index: reg number -> (date, status) entries, clustered by student ---
+def _index_rows(rows):
+    by_name = get_registry()["by_name"]
+    for date, name, status in rows:
+        student = by_name.get(name.strip().lower())
+        if student:
+            yield (student[3], date, status)
+
+def rebuild_student_index(conn=None):
+    conn = conn or get_db()
+    with conn:
+        conn.execute("DELETE FROM student_index")
+        conn.executemany(
+            "INSERT OR REPLACE INTO student_index (reg_num, date, status) VALUES (?, ?, ?)",
+            _index_rows(conn.execute("SELECT date, name, status FROM attendance").fetchall()))
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('student_index_built', ?)",
+                     (datetime.datetime.now().isoformat(),))
+
+def student_history_by_reg(reg_num, status=None):
+    if status is None:
+        return get_db().execute(
+            "SELECT date, status FROM student_index WHERE reg_num = ? ORDER BY date", (reg_num,)).fetchall()
+    return get_db().execute(
+        "SELECT date, status FROM student_index WHERE reg_num = ? AND status = ? ORDER BY date",
+        (reg_num, status)).fetchall()
+
+def attendance_dates():
+    return [row[0] for row in get_db().execute("SELECT DISTINCT date FROM attendance ORDER BY date")]
+
+def attendance_on(date):
+    return get_db().execute("SELECT name, status FROM attendance WHERE date = ? ORDER BY rowid", (date,)).fetchall()
+
+def student_history(name):
+    return get_db().execute("SELECT date, status FROM attendance WHERE name = ? ORDER BY date", (name.strip(),)).fetchall()
+
+def next_day(date):
+    return (datetime.date.fromisoformat(date) + datetime.timedelta(days=1)).isoformat()
+
+def month_bounds(year, month):
+    start = datetime.date(year, month, 1)
+    end = datetime.date(year + (month == 12), month % 12 + 1, 1)
+    return start.isoformat(), end.isoformat()
+
+def save_attendance(date, rows):
+    rows = [(date, name, status) for name, status in rows]
+    conn = get_db()
+    version_before = _db_version(conn)
+    with conn:
+        existing = {name.lower(): status for name, status in
+                    conn.execute("SELECT name, status FROM attendance WHERE date = ?", (date,))}
+        conn.executemany(
+            "INSERT INTO attendance (date, name, status) VALUES (?, ?, ?) "
+            "ON CONFLICT (date, name) DO UPDATE SET status = excluded.status", rows)
+        conn.executemany(
+            "INSERT OR REPLACE INTO student_index (reg_num, date, status) VALUES (?, ?, ?)", _index_rows(rows))
+        _apply_rollup_delta(conn, date, [(name, existing.get(name.lower()), status) for _, name, status in rows])
+    update_attendance_matrix(conn, date, [(name, status) for _, name, status in rows], version_before)
+
+# --- Monthly rollups: per-student P/A/L counts per month, kept current as deltas ---
+def _apply_rollup_delta(conn, date, changes):
+    month = date[:7]
+    if not conn.execute("SELECT 1 FROM rollup_months WHERE month = ?", (month,)).fetchone():
+        return  # built lazily the first time the month is viewed
+    deltas = []
+    for name, old_status, new_status in changes:
+        if old_status == new_status:
+            continue
+        counts = [0, 0, 0, 0]
+        if old_status in STATUS_COLUMNS:
+            counts[STATUS_COLUMNS[old_status]] -= 1
+        if new_status in STATUS_COLUMNS:
+            counts[STATUS_COLUMNS[new_status]] += 1
+        deltas.append((month, name, counts[1], counts[2], counts[3]))
+    conn.executemany(
+        "INSERT INTO monthly_rollup (month, name, presents, absents, leaves) VALUES (?, ?, ?, ?, ?) "
+        "ON CONFLICT (month, name) DO UPDATE SET presents = presents + excluded.presents, "
+        "absents = absents + excluded.absents, leaves = leaves + excluded.leaves", deltas)
+
+def rebuild_month_rollup(conn, year, month):
+    key = f"{year:04}-{month:02}"
+    with conn:
+        conn.execute("DELETE FROM monthly_rollup WHERE month = ?", (key,))
+        conn.execute(
+            "INSERT INTO monthly_rollup (month, name, presents, absents, leaves) "
+            "SELECT ?, name, SUM(status = 'P'), SUM(status = 'A'), SUM(status = 'L') "
+            "FROM attendance WHERE date >= ? AND date < ? GROUP BY name",
+            (key, *month_bounds(year, month)))
+        conn.execute("INSERT OR REPLACE INTO rollup_months (month, built_at) VALUES (?, ?)",
+                     (key, datetime.datetime.now().isoformat()))
+
+def monthly_rollup(year, month):
+    conn = get_db()
+    key = f"{year:04}-{month:02}"
+    if not conn.execute("SELECT 1 FROM rollup_months WHERE month = ?", (key,)).fetchone():
+        rebuild_month_rollup(conn, year, month)
+    return conn.execute(
+        "SELECT name, presents, absents, leaves FROM monthly_rollup WHERE month = ?", (key,)).fetchall()
+
+def invalidate_rollups():
+    with get_db() as conn:
+        conn.execute("DELETE FROM monthly_rollup")
+        conn.execute("DELETE FROM rollup_months")
+
+# --- Attendance matrix: students x days of int8 status codes (0 = no record, 1 = P, 2 = A, 3 = L) ---
+# Alongside it, per-student cumulative P/A/L counts over the date axis ("prefix sums"), so the
+# totals for any date range are two lookups per student. Both arrays keep spare day columns so
+# that recording a new day appends in O(students) instead of reallocating.
+STATUS_CODES = {"P": 1, "A": 2, "L": 3}
+_matrix = {"version": None}
+_matrix_lock = threading.RLock()  # a rebuild (e.g. the scheduler's warmup) never interleaves with an in-place update
+
+def _db_version(conn):
+    # The file change counter in the database header is bumped by every committed write,
+    # whichever thread or process made it, so a cache built on one connection is valid on all.
+    with open(ATTENDANCE_DB, "rb") as file:
+        header = file.read(28)
+        inode = os.fstat(file.fileno()).st_ino
+    return (os.path.abspath(ATTENDANCE_DB), inode, int.from_bytes(header[24:28], "big"))
+
+def _matrix_capacity(days):
+    return days + max(32, days // 4)
+
+def load_attendance_matrix():
+    import numpy as np
+
+    with _matrix_lock:
+        conn = get_db()
+        version = _db_version(conn)
+        if _matrix["version"] == version:
+            return _matrix
+
+        by_name = get_registry()["by_name"]
+        # One read transaction, so a day recorded by another process cannot land between the
+        # queries (a write after `version` was read just makes the next call rebuild again)
+        conn.execute("BEGIN")
+        try:
+            dates = attendance_dates()
+            names = [row[0] for row in conn.execute("SELECT DISTINCT name FROM attendance ORDER BY name")]
+            name_row = {name.lower(): i for i, name in enumerate(names)}
+            date_col = {date: i for i, date in enumerate(dates)}
+
+            capacity = _matrix_capacity(len(dates))
+            codes = np.zeros((len(names), capacity), dtype=np.int8)
+            cursor = conn.execute("SELECT date, name, status FROM attendance")
+            while True:
+                batch = cursor.fetchmany(100000)
+                if not batch:
+                    break
+                rows = np.fromiter((name_row[name.lower()] for _, name, _ in batch), dtype=np.int64, count=len(batch))
+                cols = np.fromiter((date_col[date] for date, _, _ in batch), dtype=np.int64, count=len(batch))
+                values = np.fromiter((STATUS_CODES.get(status, 0) for _, _, status in batch), dtype=np.int8, count=len(batch))
+                codes[rows, cols] = values
+        finally:
+            conn.rollback()
+
+        # cumulative[k, student, d] = number of status k+1 before day d (uint16 covers 179 years of days)
+        cumulative = np.zeros((3, len(names), capacity + 1), dtype=np.uint16)
+        for k in range(3):
+            np.cumsum(codes[:, :len(dates)] == k + 1, axis=1, out=cumulative[k, :, 1:len(dates) + 1])
+
+        date_array = np.empty(capacity, dtype="U10")
+        date_array[:len(dates)] = dates
+        _matrix.update(
+            version=version,
+            days=len(dates),
+            codes_buffer=codes,
+            cumulative=cumulative,
+            dates_buffer=date_array,
+            names=np.array(names, dtype=object),
+            regs=np.array([(by_name.get(name.lower()) or ("", "", "", ""))[3] for name in names], dtype=object),
+            row_of=name_row,
+            codes=codes[:, :len(dates)],
+            dates=date_array[:len(dates)],
+            streak_base=None,
+        )
+        return _matrix
+
+# Called after save_attendance(): append a new last day or repair an edited day in place.
+# Anything else (a back-dated new day, a student never seen before) just drops the cache, as
+# does a cache that was already stale before this write (another process recorded in between).
+def update_attendance_matrix(conn, date, rows, version_before):
+    with _matrix_lock:
+        if _matrix["version"] != version_before:
+            _matrix["version"] = None
+            return
+        days = _matrix["days"]
+        row_of = _matrix["row_of"]
+        if any(name.lower() not in row_of for name, _ in rows):
+            _matrix["version"] = None
+            return
 
-        if not os.path.exists(STATS_FILE):
-            print("Master attendance file doesn't exist.")
+        col = int(_matrix["dates"].searchsorted(date))
+        if col < days and _matrix["dates"][col] == date:
+            pass
+        elif (not days or date > _matrix["dates_buffer"][days - 1]) and days < _matrix["codes_buffer"].shape[1]:
+            col = days
+            if days and _matrix["streak_base"] is not None:
+                _matrix["streak_base"] = _advance_streaks(*_matrix["streak_base"], _matrix["codes_buffer"][:, days - 1])
+            _matrix["dates_buffer"][col] = date
+            _matrix["cumulative"][:, :, col + 1] = _matrix["cumulative"][:, :, col]
+            days += 1
+        else:
+            _matrix["version"] = None
             return
 
-        found = False
+        if col < days - 1:
+            _matrix["streak_base"] = None  # an edit before the last day: streaks are recomputed on next use
+
+        codes = _matrix["codes_buffer"]
+        cumulative = _matrix["cumulative"]
+        for name, status in rows:
+            row = row_of[name.lower()]
+            old_code, new_code = codes[row, col], STATUS_CODES.get(status, 0)
+            if old_code == new_code:
+                continue
+            if old_code:
+                cumulative[old_code - 1, row, col + 1:days + 1] -= 1
+            if new_code:
+                cumulative[new_code - 1, row, col + 1:days + 1] += 1
+            codes[row, col] = new_code
+
+        _matrix["days"] = days
+        _matrix["codes"] = codes[:, :days]
+        _matrix["dates"] = _matrix["dates_buffer"][:days]
+        _matrix["version"] = _db_version(conn)
+
+def _date_slice(matrix, start=None, end=None):
+    dates = matrix["dates"]
+    lo = 0 if start is None else int(dates.searchsorted(start, side="left"))
+    hi = len(dates) if end is None else int(dates.searchsorted(end, side="left"))
+    return slice(lo, hi)
+
+def _with_percentage(presents, absents, leaves):
+    counted = presents + absents
+    return presents, absents, leaves, presents * 100.0 / counted.clip(min=1)
+
+def student_totals(start=None, end=None):
+    # P/A/L per student for dates in [start, end); start may be an array with one date per student
+    import numpy as np
+
+    matrix = load_attendance_matrix()
+    dates = matrix["dates"]
+    lo = 0 if start is None else dates.searchsorted(start, side="left")
+    hi = len(dates) if end is None else dates.searchsorted(end, side="left")
+    students = np.arange(len(matrix["names"]))
+    counts = matrix["cumulative"][:, students, hi].astype(np.int64) - matrix["cumulative"][:, students, lo]
+    return (matrix["names"], matrix["regs"], *_with_percentage(counts[0], counts[1], counts[2]))
+
+def date_totals(start=None, end=None):
+    matrix = load_attendance_matrix()
+    columns = _date_slice(matrix, start, end)
+    codes = matrix["codes"][:, columns]
+    totals = [(codes == k).sum(axis=0) for k in (1, 2, 3)]
+    return (matrix["dates"][columns], *_with_percentage(*totals))
+
+# --- Trend analytics: rolling percentages, absence streaks and week-over-week change ---
+# Streaks are kept as the state before the last recorded day ("streak base"); recording or
+# re-recording the last day only has to advance that state by one column.
+ROLLING_DAYS = 30
+AT_RISK_PERCENTAGE = 75
+AT_RISK_MIN_DAYS = 5  # counted (present or absent) days in the window before the percentage is trusted
+AT_RISK_STREAK = 3
+AT_RISK_FILE = "at_risk_students.csv"
+
+def _advance_streaks(current, longest, column):
+    import numpy as np
+
+    current = np.where(column == STATUS_CODES["A"], current + 1, np.where(column == 0, current, 0))
+    return current, np.maximum(longest, current)
+
+def absence_streaks():
+    import numpy as np
+
+    matrix = load_attendance_matrix()
+    days = matrix["days"]
+    if matrix["streak_base"] is None:
+        current = longest = np.zeros(len(matrix["names"]), dtype=np.int32)
+        for col in range(max(0, days - 1)):
+            current, longest = _advance_streaks(current, longest, matrix["codes"][:, col])
+        matrix["streak_base"] = (current, longest)
+    if not days:
+        return matrix["streak_base"]
+    return _advance_streaks(*matrix["streak_base"], matrix["codes"][:, days - 1])
+
+def _window_percentage(matrix, lo, hi):
+    import numpy as np
+
+    presents = matrix["cumulative"][0, :, hi].astype(np.int64) - matrix["cumulative"][0, :, lo]
+    absents = matrix["cumulative"][1, :, hi].astype(np.int64) - matrix["cumulative"][1, :, lo]
+    counted = presents + absents
+    return np.where(counted > 0, presents * 100.0 / counted.clip(min=1), np.nan), presents, counted
+
+def attendance_trends(window=ROLLING_DAYS):
+    import numpy as np
+
+    matrix = load_attendance_matrix()
+    days = matrix["days"]
+    dates = matrix["dates"]
+    rolling, _, counted = _window_percentage(matrix, max(0, days - window), days)
+
+    this_week = previous_week = np.full(len(matrix["names"]), np.nan)
+    if days:
+        last = datetime.date.fromisoformat(dates[-1])
+        week_start = int(dates.searchsorted((last - datetime.timedelta(days=6)).isoformat()))
+        previous_start = int(dates.searchsorted((last - datetime.timedelta(days=13)).isoformat()))
+        this_week, _, _ = _window_percentage(matrix, week_start, days)
+        previous_week, _, _ = _window_percentage(matrix, previous_start, week_start)
+
+    current_streak, longest_streak = absence_streaks()
+    return {
+        "names": matrix["names"],
+        "regs": matrix["regs"],
+        "rolling": rolling,
+        "rolling_days": counted,
+        "week_change": this_week - previous_week,
+        "current_streak": current_streak,
+        "longest_streak": longest_streak,
+    }
+
+def grade_trends(trends):
+    import numpy as np
+
+    by_name = get_registry()["by_name"]
+    grades = np.array([grade_key((by_name.get(name.lower()) or ("", "", ""))[2]) for name in trends["names"]], dtype=object)
+    active = grades != ""
+    labels, group = np.unique(grades[active].astype(str), return_inverse=True)
+    summary = []
+    for key in ("rolling", "week_change"):
+        values = trends[key][active]
+        known = ~np.isnan(values)
+        sums = np.bincount(group[known], weights=values[known], minlength=len(labels))
+        counts = np.bincount(group[known], minlength=len(labels))
+        summary.append(np.where(counts > 0, sums / counts.clip(min=1), np.nan))
+    students = np.bincount(group, minlength=len(labels))
+    return list(zip(labels, students, summary[0], summary[1]))
+
+def at_risk_students(trends=None):
+    import numpy as np
+
+    trends = trends or attendance_trends()
+    by_name = get_registry()["by_name"]
+    active = np.array([name.lower() in by_name for name in trends["names"]], dtype=bool)
+    low = (trends["rolling"] < AT_RISK_PERCENTAGE) & (trends["rolling_days"] >= AT_RISK_MIN_DAYS)
+    flagged = active & (low | (trends["current_streak"] >= AT_RISK_STREAK))
+    # Longest current absence streak first, then lowest rolling attendance
+    order = np.lexsort((np.nan_to_num(trends["rolling"], nan=100.0), -trends["current_streak"]))
+    return [[trends["names"][i], trends["regs"][i], f"{trends['rolling'][i]:.2f}%",
+             int(trends["current_streak"][i]), int(trends["longest_streak"][i])]
+            for i in order if flagged[i]]
+
+def report_at_risk():
+    try:
+        rows = at_risk_students()
+    except ImportError:
+        return  # numpy is not installed; attendance is still recorded
+    with open(AT_RISK_FILE, "w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(["Name", "Regno", f"Last {ROLLING_DAYS} days", "Current absence streak", "Longest absence streak"])
+        writer.writerows(rows)
+    if rows:
+        print(f"⚠ {len(rows)} student(s) at risk (below {AT_RISK_PERCENTAGE}% over the last {ROLLING_DAYS} days "
+              f"or absent {AT_RISK_STREAK}+ days in a row). See '{AT_RISK_FILE}'.")
+
+def view_trends():
+    trends = attendance_trends()
+    grades = grade_trends(trends)
+    if not grades:
+        print("No attendance records found.")
+        return
+
+    print(f"\nAttendance by grade (last {ROLLING_DAYS} recorded days, change vs previous week):")
+    print_table(['Grade', 'Students', 'Attendance', 'Week Change'],
+                [[grade, count, f"{rolling:.2f}%", f"{change:+.2f}%"] for grade, count, rolling, change in grades])
+
+    rows = at_risk_students(trends)
+    if not rows:
+        print("\nNo students are currently at risk.")
+        return
+    print(f"\nAt-risk students (below {AT_RISK_PERCENTAGE}% or absent {AT_RISK_STREAK}+ days in a row):")
+    print_table(['Name', 'Regno', f'Last {ROLLING_DAYS} days', 'Current Streak', 'Longest Streak'], rows)
+
+def print_table(headers, rows):
+    widths = [max(len(str(header)), *(len(str(row[i])) for row in rows)) for i, header in enumerate(headers)]
+    row_format = "| " + " | ".join(f"{{:^{width}}}" for width in widths) + " |"
+    line = "-" * (sum(widths) + 3 * len(widths) + 1)
+
+    print("\n" + line)
+    print(row_format.format(*headers))
+    print(line)
+    for row in rows:
+        print(row_format.format(*row))
+        print(line)
+
+# --- Master stats: fixed-width binary counters, one record slot per student, updated in place via mmap ---
+# File layout: 16-byte header (magic, record count) followed by records of
+# registration number, name and the P/A/L counters. master_attendance.txt is kept as a text export.
+# Names are stored whole; longer ones are refused at enrolment (see name_fits()).
+COUNTER_MAGIC = b"MAC2"
+COUNTER_HEADER = struct.Struct("<4sI8x")
+COUNTER_NAME_SIZE = 192
+# counts are signed: a master file restored from an older backup can be behind the history, and
+# correcting one of the newer days then takes a count below zero until it is reconciled
+COUNTER_RECORD = struct.Struct(f"<16s{COUNTER_NAME_SIZE}s3i")
+COUNTER_VALUES = struct.Struct("<3i")
+COUNTER_VALUES_OFFSET = 16 + COUNTER_NAME_SIZE
+# MAC1 files (64-byte names, cut to fit) are upgraded the first time they are opened
+LEGACY_COUNTER_MAGIC = b"MAC1"
+LEGACY_COUNTER_RECORD = struct.Struct("<16s64s3i")
+_counters = {"identity": None, "map": None, "count": 0, "by_reg": {}, "by_name": {}}
+
+def name_fits(name):
+    return len(name.encode("utf-8")) <= COUNTER_NAME_SIZE
+
+def _pack_text(text, size):
+    data = text.encode("utf-8")
+    if len(data) > size:
+        raise ValueError(f"'{text}' is too long for the master counters ({len(data)} bytes, at most {size}).")
+    return data
+
+def _counter_records(lines):
+    return [COUNTER_RECORD.pack(_pack_text(reg, 16), _pack_text(name, COUNTER_NAME_SIZE), int(p), int(a), int(l))
+            for reg, name, p, a, l in lines]
+
+def _write_counter_file(records):
+    with open(COUNTER_FILE + ".tmp", "wb") as file:
+        file.write(COUNTER_HEADER.pack(COUNTER_MAGIC, len(records)))
+        file.writelines(records)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(COUNTER_FILE + ".tmp", COUNTER_FILE)
+
+# Every line of the student file, deleted students included (they keep their counter slot)
+def _student_file_rows():
+    if os.path.exists(STUDENT_FILE):
+        with open(STUDENT_FILE, "r") as file:
+            for line in file:
+                parts = line.strip().split(",")
+                if len(parts) == 5:
+                    yield parts
+
+def _migrate_master_text():
+    # students who share a name get its lines in enrolment order, which is the order they were exported in
+    regs_by_name = {}
+    for parts in _student_file_rows():
+        regs_by_name.setdefault(parts[0].lower(), []).append(parts[3])
+
+    lines = []
+    seen = set()
+    if os.path.exists(STATS_FILE):
         with open(STATS_FILE, "r") as file:
             for line in file:
-                name, p, a, l = line.strip().split(",")
-                if name.lower() == student_name.lower():
-                    found = True
-                    total_classes = int(p) + int(a) + int(l)
-                    percentage = (int(p) / (total_classes - int(l))) * 100 if total_classes > 0 else 0
-
-                    students = load_students()
-                    for student in students:
-                        if student[0].lower() == student_name.lower():
-                            registration_number = student[3]
-                            grade = student[2]
-                            joining_date = student[4]
-                            break
-
-                    print(f"\nStats for {name}:")
-                    print(f"Registration Number: {registration_number}")
-                    print(f"Grade: {grade}")
-                    print(f"Joining Date: {joining_date}")
-                    print(f"Total Classes: {total_classes}")
-                    print(f"Total Presents: {p}")
-                    print(f"Total Leaves: {l}")
-                    print(f"Total Absents: {a}")
-                    print(f"Attendance Percentage: {percentage:.2f}%")
-                    break
+                _io_stats["lines_parsed"] += 1
+                parts = line.strip().split(",")
+                if len(parts) != 4:
+                    continue
+                key = parts[0].lower()
+                if regs_by_name.get(key):
+                    lines.append((regs_by_name[key].pop(0), *parts))
+                elif key not in seen:
+                    lines.append(("", *parts))
+                seen.add(key)
+    _write_counter_file(_counter_records(lines))
+
+def _upgrade_counter_file():
+    with open(COUNTER_FILE, "rb") as file:
+        data = file.read()
+    magic, count = COUNTER_HEADER.unpack_from(data, 0)
+    if magic != LEGACY_COUNTER_MAGIC:
+        return  # another process upgraded it first
+    # names that were cut to 64 bytes come back whole from the student file
+    name_by_reg = {parts[3]: parts[0] for parts in _student_file_rows()}
+    records = []
+    for slot in range(count):
+        reg, name, p, a, l = LEGACY_COUNTER_RECORD.unpack_from(data, COUNTER_HEADER.size + slot * LEGACY_COUNTER_RECORD.size)
+        reg = reg.rstrip(b"\0").decode("utf-8")
+        name = name_by_reg.get(reg) or name.rstrip(b"\0").decode("utf-8")
+        records.append(COUNTER_RECORD.pack(_pack_text(reg, 16), _pack_text(name, COUNTER_NAME_SIZE), p, a, l))
+    _write_counter_file(records)
+
+def close_counters():
+    if _counters["map"] is not None:
+        _counters["map"].close()
+    _counters.update(identity=None, map=None, count=0, by_reg={}, by_name={})
+
+# Map the counter file, migrating master_attendance.txt the first time. Slots are only ever
+# appended, so a remap after another process adds students only indexes the new records.
+def get_counters():
+    if not os.path.exists(COUNTER_FILE):
+        with data_lock():
+            if not os.path.exists(COUNTER_FILE):
+                _migrate_master_text()
+
+    stat = os.stat(COUNTER_FILE)
+    identity = (stat.st_dev, stat.st_ino)
+    if identity != _counters["identity"]:
+        close_counters()
+    elif stat.st_size == COUNTER_HEADER.size + _counters["count"] * COUNTER_RECORD.size:
+        return _counters
+
+    with open(COUNTER_FILE, "r+b") as file:
+        counter_map = mmap.mmap(file.fileno(), 0)
+    magic, count = COUNTER_HEADER.unpack_from(counter_map, 0)
+    if magic == LEGACY_COUNTER_MAGIC:
+        counter_map.close()
+        with data_lock():
+            _upgrade_counter_file()
+        return get_counters()
+    if magic != COUNTER_MAGIC:
+        counter_map.close()
+        raise ValueError(f"{COUNTER_FILE} is not a master attendance counter file.")
+    if _counters["map"] is not None:
+        _counters["map"].close()
+
+    by_reg, by_name = _counters["by_reg"], _counters["by_name"]
+    for slot in range(_counters["count"], count):
+        reg, name, _, _, _ = COUNTER_RECORD.unpack_from(counter_map, COUNTER_HEADER.size + slot * COUNTER_RECORD.size)
+        reg = reg.rstrip(b"\0").decode("utf-8")
+        if reg:
+            by_reg.setdefault(reg, slot)
+        by_name.setdefault(name.rstrip(b"\0").decode("utf-8").lower(), slot)
+    _counters.update(identity=identity, map=counter_map, count=count)
+    return _counters
+
+def _read_counter(counters, slot):
+    _, name, p, a, l = COUNTER_RECORD.unpack_from(counters["map"], COUNTER_HEADER.size + slot * COUNTER_RECORD.size)
+    return [name.rstrip(b"\0").decode("utf-8"), p, a, l]
+
+def _counter_slot(counters, name):
+    student = find_student(name)
+    if student and student[3] in counters["by_reg"]:
+        return counters["by_reg"][student[3]]
+    return counters["by_name"].get(name.lower())
+
+# Append zeroed (or given) counters for new students; callers hold data_lock().
+def add_counters(records):
+    counters = get_counters()
+    records = [(reg, name, p, a, l) for reg, name, p, a, l in records
+               if (reg and reg not in counters["by_reg"]) or (not reg and name.lower() not in counters["by_name"])]
+    if not records:
+        return
+    with open(COUNTER_FILE, "r+b") as file:
+        file.seek(0, os.SEEK_END)
+        for reg, name, p, a, l in records:
+            file.write(COUNTER_RECORD.pack(_pack_text(reg, 16), _pack_text(name, COUNTER_NAME_SIZE), p, a, l))
+        file.seek(0)
+        file.write(COUNTER_HEADER.pack(COUNTER_MAGIC, counters["count"] + len(records)))
+        file.flush()
+        os.fsync(file.fileno())
+    get_counters()
+
+def get_master_stats(names):
+    counters = get_counters()
+    stats = {}
+    for name in names:
+        slot = _counter_slot(counters, name)
+        if slot is not None:
+            stats[name.lower()] = _read_counter(counters, slot)
+    return stats
+
+# Active students' [name, p, a, l] keyed by registration number, so a new student who shares a
+# deleted student's name is shown with their own counts
+def load_master_stats():
+    counters = get_counters()
+    stats = {}
+    for student in load_students():
+        slot = counters["by_reg"].get(student[3])
+        if slot is not None:
+            stats[student[3]] = _read_counter(counters, slot)
+    return stats
+
+# Every slot in file order, deleted students and legacy entries included
+def master_stats_slots():
+    counters = get_counters()
+    return [_read_counter(counters, slot) for slot in range(counters["count"])]
+
+# Write each [name, p, a, l] into its slot in place, appending slots for names not seen before.
+def save_master_stats(records):
+    records = list(records)
+    counters = get_counters()
+    missing = [record for record in records if _counter_slot(counters, record[0]) is None]
+    if missing:
+        add_counters([((find_student(name) or ("", "", "", ""))[3], name, p, a, l) for name, p, a, l in missing])
+        counters = get_counters()
+    for name, p, a, l in records:
+        slot = _counter_slot(counters, name)
+        COUNTER_VALUES.pack_into(counters["map"], COUNTER_HEADER.size + slot * COUNTER_RECORD.size + COUNTER_VALUES_OFFSET,
+                                 int(p), int(a), int(l))
+    counters["map"].flush()
+
+# Rewrite the counter file without the slots of the given registration numbers.
+def drop_counters(reg_nums):
+    counters = get_counters()
+    slots = {counters["by_reg"][reg] for reg in reg_nums if reg in counters["by_reg"]}
+    if not slots:
+        return 0
+    records = [bytes(counters["map"][COUNTER_HEADER.size + slot * COUNTER_RECORD.size:
+                                     COUNTER_HEADER.size + (slot + 1) * COUNTER_RECORD.size])
+               for slot in range(counters["count"]) if slot not in slots]
+    close_counters()
+    _write_counter_file(records)
+    return len(slots)
+
+def master_stats_lines(records):
+    return [f"{name},{p},{a},{l}\n" for name, p, a, l in records]
+
+def write_file_atomic(path, lines):
+    with open(path + ".tmp", "w") as file:
+        file.writelines(lines)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(path + ".tmp", path)
+
+def export_master_stats(path=STATS_FILE):
+    write_file_atomic(path, master_stats_lines(master_stats_slots()))
+
+# --- Reconcile master stats with the attendance history ---
+def _count_shard(db_path, start, end):
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        return conn.execute(
+            "SELECT name, SUM(status = 'P'), SUM(status = 'A'), SUM(status = 'L') FROM attendance "
+            "WHERE date >= ? AND date <= ? GROUP BY name", (start, end)).fetchall()
+    finally:
+        conn.close()
+
+def recompute_master_stats(workers=None):
+    dates = attendance_dates()
+    workers = workers or os.cpu_count() or 1
+    shard_size = max(1, -(-len(dates) // workers))
+    shards = [(dates[i], dates[min(i + shard_size, len(dates)) - 1]) for i in range(0, len(dates), shard_size)]
+    db_path = os.path.abspath(ATTENDANCE_DB)
+
+    if len(shards) > 1 and len(dates) >= 365:
+        import concurrent.futures
+
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_count_shard, [db_path] * len(shards), *zip(*shards)))
+    else:
+        results = [_count_shard(db_path, start, end) for start, end in shards]
+
+    # attendance moved to the archive still counts towards the master stats
+    results.append(get_db().execute("SELECT name, presents, absents, leaves FROM archive_totals").fetchall())
+    computed = {}
+    for rows in results:
+        for name, p, a, l in rows:
+            record = computed.setdefault(name.lower(), [name, 0, 0, 0])
+            record[1] += p
+            record[2] += a
+            record[3] += l
+    return computed
+
+def reconcile_master_stats(rewrite=False, workers=None):
+    with data_lock() if rewrite else contextlib.nullcontext():
+        return _reconcile_master_stats(rewrite, workers)
+
+def _reconcile_master_stats(rewrite, workers):
+    computed = recompute_master_stats(workers)
+    # the history is kept by name, so students who share one (a deleted student and a new one)
+    # are compared as their sum; a rewrite corrects the active student's slot
+    stats = {}
+    for name, p, a, l in master_stats_slots():
+        record = stats.setdefault(name.lower(), [name, 0, 0, 0])
+        record[1] += p
+        record[2] += a
+        record[3] += l
+
+    drift = []
+    for key in list(stats) + [key for key in computed if key not in stats]:
+        current = stats.get(key)
+        expected = computed.get(key)
+        name = (current or expected)[0]
+        current_counts = tuple(current[1:]) if current else (0, 0, 0)
+        expected_counts = tuple(expected[1:]) if expected else (0, 0, 0)
+        if current_counts != expected_counts:
+            drift.append((name, current_counts, expected_counts))
+
+    if rewrite and drift:
+        counters = get_counters()
+        fixes = []
+        for name, current, expected in drift:
+            slot = _counter_slot(counters, name)
+            own = _read_counter(counters, slot)[1:] if slot is not None else [0, 0, 0]
+            fixes.append([name, *(e - (c - o) for e, c, o in zip(expected, current, own))])
+        save_master_stats(fixes)
+    return drift
+
+def check_master_stats():
+    start = time.perf_counter()
+    drift = reconcile_master_stats()
+    elapsed = time.perf_counter() - start
+
+    if not drift:
+        print(f"Master stats match the attendance history ({elapsed:.2f}s).")
+        return
 
-        if not found:
-            print(f"No record found for {student_name}.")
+    print(f"\n{len(drift)} student(s) differ from the attendance history ({elapsed:.2f}s):")
+    print("Name: master P/A/L -> history P/A/L")
+    for name, current, expected in drift:
+        print(f"{name}: {current[0]}/{current[1]}/{current[2]} -> {expected[0]}/{expected[1]}/{expected[2]}")
+
+    fix = input("\nRewrite master stats from the attendance history? (y/n): ").strip().lower()
+    if fix == 'y':
+        reconcile_master_stats(rewrite=True)
+        print("Master stats rewritten from the attendance history.")
+
+# --- Journaled commits: master stats and a day's attendance change together or not at all ---
+def _apply_journal(journal):
+    save_attendance(journal["date"], journal["rows"])
+    if "master" in journal:
+        # journals written before the binary counter store carry the whole text file
+        journal["counters"] = [line.strip().split(",") for line in journal["master"] if line.strip()]
+    save_master_stats(journal["counters"])
+
+def recover_pending_commit():
+    with data_lock():
+        if not os.path.exists(JOURNAL_FILE):
+            return
+        try:
+            with open(JOURNAL_FILE, "r") as file:
+                journal = json.load(file)
+        except ValueError:
+            os.remove(JOURNAL_FILE)
+            print("Discarded an incomplete attendance change that was interrupted before it was saved.")
+            return
+        try:
+            _apply_journal(journal)
+        except Exception as error:
+            # set it aside rather than failing every later commit (and startup) on the same replay
+            os.replace(JOURNAL_FILE, FAILED_JOURNAL_FILE)
+            print(f"Could not recover the interrupted attendance change for {journal.get('date')} "
+                  f"({type(error).__name__}: {error}). It was moved to '{FAILED_JOURNAL_FILE}'; "
+                  "use 'Check master stats against attendance history' to repair the counts.")
+            return
+        os.remove(JOURNAL_FILE)
+        print(f"Recovered an interrupted attendance change for {journal['date']}.")
+
+# Merge one session's statuses for a date into the master counters and the daily record.
+# Everything is read under the lock, so concurrent sessions never overwrite each other's
+# counts, and re-recording a student on the same date replaces their status instead of
+# counting it twice.
+def commit_attendance(date, rows):
+    rows = [(name, status) for name, status in rows]
+    with data_lock():
+        recover_pending_commit()
+        recorded = {name.lower(): status for name, status in attendance_on(date)}
+        stats = get_master_stats(name for name, _ in rows)
+        for name, status in rows:
+            old_status = recorded.get(name.lower())
+            if old_status == status:
+                continue
+            record = stats.setdefault(name.lower(), [name, 0, 0, 0])
+            if old_status in STATUS_COLUMNS:
+                record[STATUS_COLUMNS[old_status]] -= 1
+            record[STATUS_COLUMNS[status]] += 1
+
+        journal = {"date": date, "rows": [list(row) for row in rows], "counters": list(stats.values())}
+        write_file_atomic(JOURNAL_FILE, [json.dumps(journal)])
+        _apply_journal(journal)
+        os.remove(JOURNAL_FILE)
+
+def read_attendance_csv(path):
+    statuses = {}
+    with open(path, "r", newline="") as file:
+        for row in csv.reader(file):
+            _io_stats["lines_parsed"] += 1
+            if len(row) >= 2 and row[0].strip():
+                statuses[row[0].strip()] = row[1]
+    return statuses
+
+def resolve_statuses(statuses):
+    registry = get_registry()
+    resolved = []
+    unknown = []
+    for key, status in statuses.items():
+        student = registry["by_reg"].get(key.strip()) or registry["by_name"].get(key.strip().lower())
+        if not isinstance(status, str):
+            raise ValueError(f"Invalid status {status!r} for {key}. Use P, A, or L.")
+        status = status.strip().upper()
+        if student is None:
+            unknown.append(key)
+        elif status not in STATUS_COLUMNS:
+            raise ValueError(f"Invalid status '{status}' for {key}. Use P, A, or L.")
+        else:
+            resolved.append((student, status))
+    if unknown:
+        raise ValueError(f"Unknown students: {', '.join(unknown)}")
+    return resolved
 
-        continue_check = input("\nDo you want to check another student's record? (y/n): ").lower()
-        if continue_check != 'y':
-            break
+def record_attendance(today, entries, send_messages):
+    commit_attendance(today, [(student[0], attendance) for student, attendance in entries])
+    absent_students = [student for student, attendance in entries if attendance == "A"]
+
+    if send_messages:
+        for student in absent_students:
+            message = f"Assalam o Alaikum, {student[0]} is absent today.\nDate: {today}\nAhmed Ali"
+            queue_message(f"{today}:{student[3]}", student[0], student[1], message)
+        if absent_students:
+            print(f"{len(absent_students)} absence message(s) queued; they are sent in the background.")
 
 # --- Take attendance and send messages instantly ---
-def take_attendance():
+# Pass `statuses` (a {name or reg number: status} dict, or the path of a
+# name,status CSV file) to record a whole roster without prompting.
+def take_attendance(statuses=None, date=None):
+    if statuses is not None:
+        if isinstance(statuses, str):
+            statuses = read_attendance_csv(statuses)
+        today = normalize_date(date) if date is not None else datetime.date.today().isoformat()
+        record_attendance(today, resolve_statuses(statuses), send_messages=date is None)
+        print("Attendance recorded.")
+        report_at_risk()
+        return
+
     students = load_students()
     send_messages = True
 
@@ -148,84 +1579,185 @@ def take_attendance():
         while True:
             custom_date_input = input("Enter the date (YYYY-MM-DD): ").strip()
             try:
-                datetime.datetime.strptime(custom_date_input, "%Y-%m-%d")
-                today = custom_date_input
+                today = normalize_date(custom_date_input)
                 break
             except ValueError:
                 print("Invalid date format. Please use YYYY-MM-DD.")
     else:
         today = datetime.date.today().isoformat()
 
-    if not os.path.exists(DAILY_DIR):
-        os.makedirs(DAILY_DIR)
+    grade = input("Enter the grade for this session (leave blank for all grades): ").strip()
+    if grade:
+        students = [student for student in students if same_grade(student[2], grade)]
+        if not students:
+            print(f"No active students found in grade {grade}.")
+            return
 
-    if os.path.exists(STATS_FILE):
-        with open(STATS_FILE, "r") as file:
-            all_records = file.readlines()
-    else:
-        all_records = [f"{student[0]},0,0,0\n" for student in students]
-        with open(STATS_FILE, "w") as file:
-            file.writelines(all_records)
+    print("\nEntry mode:")
+    print("1. Enter attendance for each student")
+    print("2. Mark everyone present, then enter exceptions by registration number")
+    entry_mode = input("Choose an option: ").strip()
 
     for i, student in enumerate(students):
-        print(f"{i + 1}. {student[0]} (Grade {student[2]})")
+        print(f"{i + 1}. {student[0]} (Grade {student[2]}, Reg: {student[3]})")
 
-    absent_students = []
-    daily_lines = []
-
-    for i, student in enumerate(students):
+    if entry_mode == "2":
+        statuses = {student[3].upper(): "P" for student in students}
         while True:
-            attendance = input(f"Enter attendance for {student[0]} (P/A/L): ").strip().upper()
-            if attendance in ["P", "A", "L"]:
+            exception = input("Enter an exception as '<reg number> <A/L/P>' (or type 'done' to finish): ").strip().upper()
+            if exception == "DONE":
                 break
+            parts = exception.split()
+            if len(parts) != 2 or parts[1] not in ["P", "A", "L"]:
+                print("Invalid input. Example: MA250501 A")
+            elif parts[0] not in statuses:
+                print(f"No student with registration number {parts[0]} in this session.")
             else:
-                print("Invalid input. Please enter P (Present), A (Absent), or L (Leave).")
-
-        daily_lines.append(f"{student[0]},{attendance}\n")
-
-        for j, line in enumerate(all_records):
-            name, p, a, l = line.strip().split(",")
-            if name.lower() == student[0].lower():
-                if attendance == "P":
-                    all_records[j] = f"{name},{int(p)+1},{a},{l}\n"
-                elif attendance == "A":
-                    all_records[j] = f"{name},{p},{int(a)+1},{l}\n"
-                    absent_students.append(student)
-                elif attendance == "L":
-                    all_records[j] = f"{name},{p},{a},{int(l)+1}\n"
-
-    with open(STATS_FILE, "w") as file:
-        file.writelines(all_records)
-
-    with open(os.path.join(DAILY_DIR, f"{today}.txt"), "w") as daily_file:
-        daily_file.writelines(daily_lines)
-
-    if send_messages:
-        for student in absent_students:
-            phone_number = student[1]
-            message = f"Assalam o Alaikum, {student[0]} is absent today.\nDate: {today}\nAhmed Ali"
-
-            try:
-                pwk.sendwhatmsg_instantly(phone_number, message, wait_time=15, tab_close=True, close_time=3)
-            except Exception as e:
-                print(f"Error sending message to {student[0]}: {e}")
-
-    print("Attendance recorded and messages sent.")
+                statuses[parts[0]] = parts[1]
+        entries = [(student, statuses[student[3].upper()]) for student in students]
+    else:
+        entries = []
+        for student in students:
+            while True:
+                attendance = input(f"Enter attendance for {student[0]} (P/A/L): ").strip().upper()
+                if attendance in ["P", "A", "L"]:
+                    break
+                else:
+                    print("Invalid input. Please enter P (Present), A (Absent), or L (Leave).")
+            entries.append((student, attendance))
+
+    record_attendance(today, entries, send_messages)
+    print("Attendance recorded.")
+    report_at_risk()
+
+# --- Snapshot storage: compressed, content-addressed chunks plus one manifest per backup ---
+def _snapshot_paths():
+    paths = [STUDENT_FILE, STATS_FILE, COUNTER_FILE, DELETED_STUDENTS_FILE, ATTENDANCE_DB]
+    for directory in [DAILY_DIR, ARCHIVE_DIR]:
+        if os.path.isdir(directory):
+            paths += [os.path.join(directory, f) for f in sorted(os.listdir(directory))]
+    return paths
+
+def _object_path(digest):
+    return os.path.join(OBJECT_DIR, digest[:2], digest)
+
+def _store_chunk(data, stats):
+    digest = hashlib.sha256(data).hexdigest()
+    path = _object_path(digest)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        compressed = zlib.compress(data, 6)
+        with open(path + ".tmp", "wb") as file:
+            file.write(compressed)
+        os.replace(path + ".tmp", path)
+        stats["chunks"] += 1
+        stats["bytes"] += len(compressed)
+    return digest
+
+def _snapshot_file(path, previous, stats):
+    stat = os.stat(path)
+    if previous and previous["size"] == stat.st_size and previous["mtime_ns"] == stat.st_mtime_ns:
+        return previous
+    chunks = []
+    with open(path, "rb") as file:
+        for data in iter(lambda: file.read(SNAPSHOT_CHUNK_SIZE), b""):
+            chunks.append(_store_chunk(data, stats))
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "chunks": chunks}
+
+def list_snapshots():
+    if not os.path.isdir(SNAPSHOT_DIR):
+        return []
+    return sorted(f[:-5] for f in os.listdir(SNAPSHOT_DIR) if f.endswith(".json"))
+
+def load_snapshot(snapshot_id):
+    with open(os.path.join(SNAPSHOT_DIR, f"{snapshot_id}.json"), "r") as file:
+        return json.load(file)
+
+def _copy_database(path):
+    # SQLite's online backup API writes a consistent copy, page by page, much faster than reading rows
+    target = sqlite3.connect(path)
+    try:
+        get_db().backup(target)
+    finally:
+        target.close()
+
+# The data lock is held only while the small files are stored and the database is copied; the
+# copy is chunked and compressed after it is released. With blocking=False, returns None if
+# attendance is being saved.
+def create_snapshot(blocking=True):
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    snapshots = list_snapshots()
+    previous = load_snapshot(snapshots[-1])["files"] if snapshots else {}
+
+    snapshot_id = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+    suffix = 1
+    while snapshot_id in snapshots:
+        suffix += 1
+        snapshot_id = f"{datetime.datetime.now().strftime('%Y%m%d-%H%M%S')}-{suffix:02}"
+
+    stats = {"chunks": 0, "bytes": 0}
+    files = {}
+    database = None
+    with data_lock(blocking) as acquired:
+        if not acquired:
+            return None
+        export_master_stats()
+        for path in _snapshot_paths():
+            if not os.path.exists(path):
+                continue
+            key = path.replace(os.sep, "/")
+            stat = os.stat(path)
+            entry = previous.get(key)
+            if path == ATTENDANCE_DB and not (entry and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns):
+                database = (key, stat, ATTENDANCE_DB + ".snapshot")
+                _copy_database(database[2])
+            else:
+                files[key] = _snapshot_file(path, entry, stats)
+
+    if database:
+        key, stat, copy_path = database
+        try:
+            entry = _snapshot_file(copy_path, None, stats)
+        finally:
+            os.remove(copy_path)
+        # keyed by the live file's size and mtime, so an unchanged database is skipped next time
+        files[key] = dict(entry, size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+
+    manifest = {"id": snapshot_id, "created": datetime.datetime.now().isoformat(), "files": files}
+    manifest_path = os.path.join(SNAPSHOT_DIR, f"{snapshot_id}.json")
+    with open(manifest_path + ".tmp", "w") as file:
+        json.dump(manifest, file)
+    os.replace(manifest_path + ".tmp", manifest_path)
+    return snapshot_id, stats
+
+def restore_snapshot(snapshot_id):
+    files = load_snapshot(snapshot_id)["files"]
+
+    staged = []
+    for key, entry in files.items():
+        path = key.replace("/", os.sep)
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + ".restore", "wb") as file:
+            for digest in entry["chunks"]:
+                with open(_object_path(digest), "rb") as chunk:
+                    file.write(zlib.decompress(chunk.read()))
+        staged.append((path + ".restore", path))
+
+    close_db()
+    close_counters()
+    for temp_path, path in staged:
+        os.replace(temp_path, path)
+    # snapshots taken before the counter store have no COUNTER_FILE, so it is rebuilt from the text export
+    for path in [STUDENT_FILE, STATS_FILE, COUNTER_FILE, DELETED_STUDENTS_FILE, ATTENDANCE_DB]:
+        if path.replace(os.sep, "/") not in files and os.path.exists(path):
+            os.remove(path)
 
 # --- Backup Functionality ---
 def create_backup():
-    if not os.path.exists(BACKUP_DIR):
-        os.makedirs(BACKUP_DIR)
-
-    today = datetime.date.today()
-    formatted_date = today.strftime("%d_%b_%Y")
-
-    student_backup = os.path.join(BACKUP_DIR, f"students_{formatted_date}.txt")
-    stats_backup = os.path.join(BACKUP_DIR, f"master_attendance_{formatted_date}.txt")
-
-    shutil.copy(STUDENT_FILE, student_backup)
-    shutil.copy(STATS_FILE, stats_backup)
-    print("Backup created successfully.")
+    snapshot_id, stats = create_snapshot()
+    print(f"Backup created successfully. Snapshot {snapshot_id}: "
+          f"{stats['chunks']} new chunk(s), {stats['bytes'] / 1024:.1f} KB written.")
 
 # --- Restore from Backup ---
 def restore_backup():
@@ -233,37 +1765,251 @@ def restore_backup():
         print("No backup directory found.")
         return
 
+    # Snapshots first, then any backups made by older versions (students_/master_attendance_ pairs)
+    options = [("snapshot", snapshot_id) for snapshot_id in reversed(list_snapshots())]
     backups = os.listdir(BACKUP_DIR)
-    student_backups = sorted([f for f in backups if f.startswith("students_")])
-    stats_backups = sorted([f for f in backups if f.startswith("master_attendance_")])
+    for f in sorted(f for f in backups if f.startswith("students_")):
+        stats_backup = "master_attendance_" + f[len("students_"):]
+        if stats_backup in backups:
+            options.append(("legacy", f))
 
-    if not student_backups or not stats_backups:
+    if not options:
         print("No backup files found.")
         return
 
-    print("Available student backups:")
-    for i, f in enumerate(student_backups):
-        print(f"{i+1}. {f}")
+    print("Available backups:")
+    for i, (kind, name) in enumerate(options):
+        if kind == "snapshot":
+            created = datetime.datetime.fromisoformat(load_snapshot(name)["created"])
+            print(f"{i+1}. Snapshot {name} ({created.strftime('%d %b %Y %H:%M')})")
+        else:
+            print(f"{i+1}. {name} (students and master stats only)")
 
     try:
         choice = int(input("Enter the number of the backup you want to restore: ")) - 1
-        if 0 <= choice < len(student_backups):
-            shutil.copy(os.path.join(BACKUP_DIR, student_backups[choice]), STUDENT_FILE)
-            shutil.copy(os.path.join(BACKUP_DIR, stats_backups[choice]), STATS_FILE)
+        if 0 <= choice < len(options):
+            kind, name = options[choice]
+            with data_lock():
+                if kind == "snapshot":
+                    restore_snapshot(name)
+                else:
+                    shutil.copy(os.path.join(BACKUP_DIR, name), STUDENT_FILE)
+                    shutil.copy(os.path.join(BACKUP_DIR, "master_attendance_" + name[len("students_"):]), STATS_FILE)
+                    close_counters()
+                    if os.path.exists(COUNTER_FILE):
+                        os.remove(COUNTER_FILE)
+                invalidate_rollups()
             print("Backup restored successfully.")
         else:
-            
             print("Invalid choice.")
     except ValueError:
         print("Invalid input. Please enter a valid number.")
 
+# --- Archive: deleted students and closed years move out of the live files ---
+# Each archive is a gzip file of JSON lines, one per student, keyed by registration number.
+# Which archive holds which student is recorded in the attendance store, in the same
+# transaction that removes the archived rows, so a record is never live and archived at once.
+def _write_archive(filename, entries):
+    import gzip
+
+    path = os.path.join(ARCHIVE_DIR, filename)
+    os.makedirs(ARCHIVE_DIR, exist_ok=True)
+    index_rows = []
+    with gzip.open(path + ".tmp", "wt", encoding="utf-8") as file:
+        for entry in entries:
+            file.write(json.dumps(entry) + "\n")
+            index_rows.append((entry["reg_no"], entry["name"], filename))
+    with open(path + ".tmp", "rb") as file:
+        os.fsync(file.fileno())
+    os.replace(path + ".tmp", path)
+    return index_rows
+
+def _archive_year_entries(conn, year, skip_names, totals):
+    by_name = get_registry()["by_name"]
+    entry = None
+    for name, date, status in conn.execute(
+            "SELECT name, date, status FROM attendance WHERE date >= ? AND date < ? ORDER BY name, date",
+            (f"{year}-01-01", f"{int(year) + 1}-01-01")):
+        if name.lower() in skip_names:
+            continue
+        if entry is None or entry["name"].lower() != name.lower():
+            if entry:
+                yield entry
+            student = by_name.get(name.lower())
+            entry = {"reg_no": student[3] if student else "", "name": name, "history": []}
+        entry["history"].append([date, status])
+        record = totals.setdefault(name.lower(), [name, 0, 0, 0])
+        record[STATUS_COLUMNS[status]] += 1
+    if entry:
+        yield entry
+
+def _data_sizes():
+    paths = [STUDENT_FILE, STATS_FILE, COUNTER_FILE, DELETED_STUDENTS_FILE, ATTENDANCE_DB]
+    return sum(os.path.getsize(path) for path in paths if os.path.exists(path))
+
+def compact_data(close_through_year=None):
+    with data_lock():
+        recover_pending_commit()
+        return _compact_data(close_through_year)
+
+def _compact_data(close_through_year):
+    conn = get_db()
+    registry = get_registry()
+    size_before = _data_sizes()
+    stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+    with conn:
+        # registration numbers must never be reused, so seed the counters before the file loses them
+        conn.execute("BEGIN IMMEDIATE")
+        if not conn.execute("SELECT 1 FROM meta WHERE key = 'reg_sequence_seeded'").fetchone():
+            _seed_reg_sequences(conn)
+
+    # History is recorded by name, so a deleted student who shares a name with an active one
+    # cannot be separated from them; they stay in the live files (tombstoned by registration number).
+    student_lines = []
+    tombstone_lines = []
+    deleted = []
+    with open(STUDENT_FILE, "r") as file:
+        for line in file:
+            parts = line.strip().split(",")
+            if len(parts) == 5 and parts[3] not in registry["by_reg"] and parts[0].lower() not in registry["by_name"]:
+                deleted.append(parts)
+            elif line.strip():
+                student_lines.append(line if line.endswith("\n") else line + "\n")
+                if len(parts) == 5 and parts[3] not in registry["by_reg"]:
+                    tombstone_lines.append(f"{parts[3]}\n")
+
+    counters = get_counters()
+    already_archived = {row[0] for row in conn.execute(
+        "SELECT reg_num FROM archive_students JOIN archive_files USING (file) WHERE kind = 'deleted'")}
+    archived = []
+    removed_names = set()
+    for name, phone, grade, reg_num, joining_date in deleted:
+        if reg_num in already_archived:
+            # left behind by an interrupted compaction; only the live files still need rewriting
+            continue
+        slot = counters["by_reg"].get(reg_num)
+        history = conn.execute("SELECT date, status FROM attendance WHERE name = ? ORDER BY date", (name,)).fetchall()
+        removed_names.add(name.lower())
+        archived.append({"reg_no": reg_num, "name": name, "student": [name, phone, grade, reg_num, joining_date],
+                         "counters": _read_counter(counters, slot)[1:] if slot is not None else [0, 0, 0],
+                         "history": [list(row) for row in history]})
+    files = []
+    index_rows = []
+    if archived:
+        files.append((f"deleted-{stamp}.jsonl.gz", "deleted"))
+        index_rows += _write_archive(files[-1][0], archived)
+
+    # closed years: every remaining row up to the end of close_through_year, one archive per year
+    totals = {}
+    cutoff = f"{close_through_year + 1:04}-01-01" if close_through_year else None
+    years = [row[0] for row in conn.execute(
+        "SELECT DISTINCT substr(date, 1, 4) FROM attendance WHERE date < ?", (cutoff,))] if cutoff else []
+    for year in years:
+        files.append((f"attendance-{year}-{stamp}.jsonl.gz", "year"))
+        index_rows += _write_archive(files[-1][0], _archive_year_entries(conn, year, removed_names, totals))
+
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.executemany("INSERT OR REPLACE INTO archive_files (file, kind, created) VALUES (?, ?, ?)",
+                         [(file, kind, stamp) for file, kind in files])
+        conn.executemany("INSERT OR REPLACE INTO archive_students (reg_num, name, file) VALUES (?, ?, ?)", index_rows)
+        conn.executemany("DELETE FROM attendance WHERE name = ?", [(name,) for name in removed_names])
+        # their earlier closed-year totals leave the master stats along with their counter slot
+        conn.executemany("DELETE FROM archive_totals WHERE name = ?", [(name,) for name in removed_names])
+        conn.executemany("DELETE FROM student_index WHERE reg_num = ?", [(entry["reg_no"],) for entry in archived])
+        if cutoff:
+            conn.execute("DELETE FROM attendance WHERE date < ?", (cutoff,))
+            conn.execute("DELETE FROM student_index WHERE date < ?", (cutoff,))
+        conn.executemany(
+            "INSERT INTO archive_totals (name, presents, absents, leaves) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (name) DO UPDATE SET presents = presents + excluded.presents, "
+            "absents = absents + excluded.absents, leaves = leaves + excluded.leaves",
+            totals.values())
+    invalidate_rollups()
+    conn.execute("VACUUM")
+
+    # the live files now only hold active students (plus any that could not be separated, see above)
+    write_file_atomic(STUDENT_FILE, student_lines)
+    write_file_atomic(DELETED_STUDENTS_FILE, tombstone_lines)
+    drop_counters([parts[3] for parts in deleted])
+    export_master_stats()
+    if cutoff and os.path.isdir(DAILY_DIR):
+        for filename in os.listdir(DAILY_DIR):
+            if filename.endswith(".txt") and filename < cutoff:
+                os.remove(os.path.join(DAILY_DIR, filename))
+
+    rows_archived = sum(len(entry["history"]) for entry in archived) + sum(sum(t[1:]) for t in totals.values())
+    return {"students_archived": len(archived), "years_archived": years, "rows_archived": rows_archived,
+            "files": [file for file, _ in files], "bytes_before": size_before, "bytes_after": _data_sizes()}
+
+def archived_history(key):
+    key = key.strip()
+    conn = get_db()
+    files = [row[0] for row in conn.execute(
+        "SELECT DISTINCT file FROM archive_students WHERE reg_num = ? OR name = ? ORDER BY file", (key.upper(), key))]
+
+    import gzip
+
+    student = None
+    history = []
+    for filename in files:
+        with gzip.open(os.path.join(ARCHIVE_DIR, filename), "rt", encoding="utf-8") as file:
+            for line in file:
+                entry = json.loads(line)
+                if entry["reg_no"].upper() == key.upper() or entry["name"].lower() == key.lower():
+                    # deleted students carry their own details; active ones are still in the registry
+                    student = (entry.get("student") or student or get_registry()["by_reg"].get(entry["reg_no"])
+                               or [entry["name"], "", "", entry["reg_no"], ""])
+                    history += [tuple(row) for row in entry["history"]]
+    return student, sorted(history)
+
+def archive_data_menu():
+    year_input = input("Archive attendance for every year up to and including (YYYY, "
+                       "or leave blank to only archive deleted students): ").strip()
+    if year_input and not year_input.isdigit():
+        print("Invalid year. Please enter a year like 2024.")
+        return
+    if year_input and int(year_input) >= datetime.date.today().year:
+        print("Only past years can be archived.")
+        return
+
+    confirm = input("Archived data is removed from the live files (it stays viewable from the archive). "
+                    "Continue? (y/n): ").strip().lower()
+    if confirm != 'y':
+        return
+
+    result = compact_data(int(year_input) if year_input else None)
+    print(f"Archived {result['students_archived']} deleted student(s)"
+          + (f" and the attendance of {', '.join(result['years_archived'])}" if result["years_archived"] else "")
+          + f" into {len(result['files'])} archive file(s).")
+    print(f"Live data files: {result['bytes_before'] / 1024:.1f} KB -> {result['bytes_after'] / 1024:.1f} KB")
+
+def view_archived_attendance():
+    key = input("Enter the student's name or registration number: ").strip()
+    student, history = archived_history(key)
+    if not history and not student:
+        print(f"No archived records found for {key}.")
+        return
+
+    name, _, grade, reg_num, joining_date = student
+    print(f"\nArchived attendance for {name} (Reg: {reg_num or 'N/A'}, Grade: {grade or 'N/A'}):")
+    for date, status in history:
+        date_display = datetime.datetime.strptime(date, '%Y-%m-%d').strftime('%d %b %Y')
+        print(f"{date_display}: {status}")
+    presents, absents, leaves = (sum(1 for _, status in history if status == code) for code in "PAL")
+    print(f"Presents: {presents}, Absents: {absents}, Leaves: {leaves}")
+
 # --- View date-wise attendance for a student ---
 def view_attendance_by_date():
-    name = input("Enter student name: ").strip().lower()
-    if not os.path.exists(DAILY_DIR):
+    name = input("Enter student name or registration number: ").strip().lower()
+    if not attendance_dates():
         print("No daily attendance records found.")
         return
 
+    student = choose_student(name)
+    if student:
+        name = student[0].lower()
+
     print("\nSelect view option:")
     print("1. Show all records")
     print("2. Show only absent dates")
@@ -271,44 +2017,45 @@ def view_attendance_by_date():
 
     show_all = choice == "1"
 
+    if student:
+        history = student_history_by_reg(student[3], None if show_all else "A")
+    else:
+        history = student_history(name)
+
     print(f"\nDate-wise attendance for {name.title()}:")
     found = False
-    for filename in sorted(os.listdir(DAILY_DIR)):
-        path = os.path.join(DAILY_DIR, filename)
-        with open(path, "r") as f:
-            for line in f:
-                s_name, status = line.strip().split(",")
-                if s_name.strip().lower() == name:
-                    status = status.strip().upper()  # Handle 'A' or 'a'
-                    if show_all or status == "A":
-                        date_display = datetime.datetime.strptime(filename.replace('.txt', ''), '%Y-%m-%d').strftime('%d %b %Y')
-                        print(f"{date_display}: {status}")
-                        found = True
+    for date, status in history:
+        status = status.strip().upper()  # Handle 'A' or 'a'
+        if show_all or status == "A":
+            date_display = datetime.datetime.strptime(date, '%Y-%m-%d').strftime('%d %b %Y')
+            print(f"{date_display}: {status}")
+            found = True
 
     if not found:
         print("No matching attendance records found.")
 
 # --- View attendance for a specific date ---
 def view_attendance_on_specific_date():
-    if not os.path.exists(DAILY_DIR):
+    dates = attendance_dates()
+    if not dates:
         print("No daily attendance records found.")
         return
 
     print("\nAvailable attendance dates:")
-    files = sorted(os.listdir(DAILY_DIR))
-    for idx, filename in enumerate(files):
-        date_display = datetime.datetime.strptime(filename.replace('.txt', ''), '%Y-%m-%d').strftime('%d %b %Y')
+    for idx, date in enumerate(dates):
+        date_display = datetime.datetime.strptime(date, '%Y-%m-%d').strftime('%d %b %Y')
         print(f"{idx+1}. {date_display}")
 
     try:
         choice = int(input("Enter the number of the date you want to view: ")) - 1
-        if 0 <= choice < len(files):
-            selected_file = files[choice]
-            print(f"\nAttendance on {selected_file.replace('.txt','')}")
-            with open(os.path.join(DAILY_DIR, selected_file), "r") as f:
-                for line in f:
-                    s_name, status = line.strip().split(",")
-                    print(f"{s_name}: {status}")
+        if 0 <= choice < len(dates):
+            selected_date = dates[choice]
+            print(f"\nAttendance on {selected_date}")
+            for s_name, status in attendance_on(selected_date):
+                print(f"{s_name}: {status}")
+            _, presents, absents, leaves, percentage = date_totals(selected_date, next_day(selected_date))
+            print(f"Presents: {presents[0]}, Absents: {absents[0]}, Leaves: {leaves[0]}, "
+                  f"Attendance: {percentage[0]:.2f}%")
         else:
             print("Invalid choice.")
     except ValueError:
@@ -316,176 +2063,217 @@ def view_attendance_on_specific_date():
 
 # --- Edit attendance record for a specific date ---
 def edit_attendance_record():
-    if not os.path.exists(DAILY_DIR):
+    dates = attendance_dates()
+    if not dates:
         print("No attendance records found.")
         return
 
     print("\nAvailable attendance dates:")
-    files = sorted(os.listdir(DAILY_DIR))
-    for idx, filename in enumerate(files):
-        date_display = datetime.datetime.strptime(filename.replace('.txt', ''), '%Y-%m-%d').strftime('%d %b %Y')
+    for idx, date in enumerate(dates):
+        date_display = datetime.datetime.strptime(date, '%Y-%m-%d').strftime('%d %b %Y')
         print(f"{idx+1}. {date_display}")
 
     try:
         choice = int(input("Select the date number to edit: ")) - 1
-        if 0 <= choice < len(files):
-            selected_file = files[choice]
-            file_path = os.path.join(DAILY_DIR, selected_file)
-
-            with open(file_path, "r") as f:
-                lines = f.readlines()
-
-            record_dict = {line.split(",")[0].strip(): line.split(",")[1].strip() for line in lines}
+        if 0 <= choice < len(dates):
+            selected_date = dates[choice]
+            original = dict(attendance_on(selected_date))
+            record_dict = dict(original)
 
             while True:
                 print("\nCurrent Records:")
                 for name, status in record_dict.items():
                     print(f"{name}: {status}")
 
-                name_to_edit = input("\nEnter the student's name to edit (or type 'done' to finish): ").strip()
+                name_to_edit = input("\nEnter the student's name or registration number to edit (or type 'done' to finish): ").strip()
                 if name_to_edit.lower() == "done":
                     break
 
-                if name_to_edit not in record_dict:
-                    print("Student not found in this date's record.")
-                    continue
+                names = {name.lower(): name for name in record_dict}
+                if name_to_edit.lower() in names:
+                    name_to_edit = names[name_to_edit.lower()]
+                else:
+                    student = choose_student(name_to_edit, allowed=names)
+                    if not student:
+                        print("Student not found in this date's record.")
+                        continue
+                    name_to_edit = names[student[0].lower()]
 
                 new_status = input(f"Enter new status for {name_to_edit} (P/A/L): ").strip().upper()
                 if new_status not in ["P", "A", "L"]:
                     print("Invalid status. Use P, A, or L.")
                     continue
 
-                old_status = record_dict[name_to_edit]
                 record_dict[name_to_edit] = new_status
 
-                # Update master record accordingly
-                if os.path.exists(STATS_FILE):
-                    with open(STATS_FILE, "r") as f:
-                        master_lines = f.readlines()
-                    for i in range(len(master_lines)):
-                        parts = master_lines[i].strip().split(",")
-                        if parts[0].lower() == name_to_edit.lower():
-                            p, a, l = int(parts[1]), int(parts[2]), int(parts[3])
-                            # Subtract old status
-                            if old_status == "P":
-                                p -= 1
-                            elif old_status == "A":
-                                a -= 1
-                            elif old_status == "L":
-                                l -= 1
-                            # Add new status
-                            if new_status == "P":
-                                p += 1
-                            elif new_status == "A":
-                                a += 1
-                            elif new_status == "L":
-                                l += 1
-                            master_lines[i] = f"{parts[0]},{p},{a},{l}\n"
-                            break
-                    with open(STATS_FILE, "w") as f:
-                        f.writelines(master_lines)
-
-            # Rewrite daily file
-            with open(file_path, "w") as f:
-                for name, status in record_dict.items():
-                    f.write(f"{name},{status}\n")
+            changed = {name: status for name, status in record_dict.items() if status != original[name]}
+            if not changed:
+                print("No changes made.")
+                return
+
+            # Apply every change to the master counters and the daily record in one journaled commit
+            commit_attendance(selected_date, changed.items())
 
             print("Attendance record updated.")
         else:
             print("Invalid choice.")
     except ValueError:
         print("Please enter a valid number.")
-     
-# --- Copy data to Excel file ---      
+
+# --- Export attendance between two dates (end exclusive), one sheet per month ---
+def export_attendance_xlsx(start, end, output_path):
+    import pandas as pd
+    from openpyxl import Workbook
+
+    df = pd.read_sql_query(
+        "SELECT date, name, status FROM attendance WHERE date >= ? AND date < ? ORDER BY date, rowid",
+        get_db(), params=(start, end))
+    df = df[~df["name"].str.lower().isin(get_registry()["deleted"])]
+    if df.empty:
+        return 0
+
+    # write_only workbooks stream rows to disk instead of keeping every cell in memory
+    workbook = Workbook(write_only=True)
+    for month, frame in df.groupby(df["date"].str[:7], sort=True):
+        name_order = frame["name"].drop_duplicates()
+        matrix = frame.pivot(index="name", columns="date", values="status").reindex(name_order)
+        matrix = matrix.astype(object).where(matrix.notna(), None)
+
+        sheet = workbook.create_sheet(datetime.datetime.strptime(month, "%Y-%m").strftime("%B %Y"))
+        sheet.append(["Student Name"] + list(matrix.columns))
+        for name, statuses in zip(matrix.index, matrix.itertuples(index=False, name=None)):
+            sheet.append([name, *statuses])
+
+    workbook.save(output_path)
+    return len(workbook.worksheets)
+
+# --- Streaming full-history export in long form: one (date, reg_no, name, grade, status) row per mark ---
+EXPORT_COLUMNS = ["date", "reg_no", "name", "grade", "status"]
+EXPORT_BATCH_SIZE = 100000
+
+def iter_attendance_batches(batch_size=EXPORT_BATCH_SIZE, conn=None):
+    registry = get_registry()
+    # ordered by the primary key index, so SQLite streams rows without sorting the whole history
+    cursor = (conn or get_db()).execute("SELECT date, name, status FROM attendance ORDER BY date, name")
+    while True:
+        batch = cursor.fetchmany(batch_size)
+        if not batch:
+            return
+        rows = []
+        for date, name, status in batch:
+            key = name.lower()
+            if key in registry["deleted"]:
+                continue
+            student = registry["by_name"].get(key)
+            rows.append((date, student[3], name, student[2], status) if student else (date, "", name, "", status))
+        if rows:
+            yield rows
+
+def export_attendance_history(output_path, file_format="csv", batch_size=EXPORT_BATCH_SIZE, conn=None):
+    total = 0
+    if file_format == "parquet":
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        schema = pa.schema([("date", pa.date32()), ("reg_no", pa.string()), ("name", pa.string()),
+                            ("grade", pa.string()), ("status", pa.string())])
+        with pq.ParquetWriter(output_path, schema) as writer:
+            for rows in iter_attendance_batches(batch_size, conn):
+                # each batch becomes one row group, so only one batch is ever held in memory
+                columns = list(zip(*rows))
+                dates = pa.array(columns[0], pa.string()).cast(pa.date32())
+                writer.write_table(pa.Table.from_arrays([dates, *(pa.array(c, pa.string()) for c in columns[1:])],
+                                                        schema=schema))
+                total += len(rows)
+    else:
+        with open(output_path, "w", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(EXPORT_COLUMNS)
+            for rows in iter_attendance_batches(batch_size, conn):
+                writer.writerows(rows)
+                total += len(rows)
+    return total
+
+# --- Copy data to Excel file ---
 def txt_to_xls():
-    if not os.path.exists(DAILY_DIR):
+    if not attendance_dates():
         print("No daily attendance records found to export.")
         return
 
-    # Prompt user for month and year
-    month_input = input("Enter the month name to export (e.g., September): ").strip().title()
-    year_input = input("Enter the year (e.g., 2024): ").strip()
-    
-    try:
-        month_number = datetime.datetime.strptime(month_input, "%B").month
-    except ValueError:
-        print("Invalid month name. Please enter a full month name like 'September'.")
-        return
+    print("\nExport options:")
+    print("1. Single month")
+    print("2. Date range (one sheet per month, e.g. a whole academic year)")
+    print("3. Full history as CSV or Parquet (one row per student per date)")
+    export_choice = input("Choose an option: ").strip()
 
-    attendance_data = {}
-    name_order = []
+    if export_choice == '3':
+        file_format = input("Enter the file format (csv/parquet): ").strip().lower()
+        if file_format not in ["csv", "parquet"]:
+            print("Invalid format. Please enter csv or parquet.")
+            return
+        output_path = f"Attendance_history.{file_format}"
+        try:
+            rows = export_attendance_history(output_path, file_format)
+        except ImportError:
+            print("Parquet export needs the 'pyarrow' package. Install it with: pip install pyarrow")
+            return
+        print(f"✅ Full attendance history exported to '{output_path}' ({rows} row(s)) successfully!")
+        return
 
-    files_to_process = []
-    for filename in sorted(os.listdir(DAILY_DIR)):
-        if filename.endswith('.txt'):
-            try:
-                file_date = datetime.datetime.strptime(filename.replace('.txt', ''), "%Y-%m-%d")
-                if file_date.month == month_number and file_date.year == int(year_input):
-                    files_to_process.append(filename)
-            except ValueError:
-                continue
+    if export_choice == '1':
+        # Prompt user for month and year
+        month_input = input("Enter the month name to export (e.g., September): ").strip().title()
+        year_input = input("Enter the year (e.g., 2024): ").strip()
 
-    if not files_to_process:
-        print("No attendance records found for the specified month.")
-        return
+        try:
+            month_number = datetime.datetime.strptime(month_input, "%B").month
+        except ValueError:
+            print("Invalid month name. Please enter a full month name like 'September'.")
+            return
 
-    for idx, file_name in enumerate(files_to_process):
-        date = file_name.replace('.txt', '')
-        file_path = os.path.join(DAILY_DIR, file_name)
+        if not year_input.isdigit():
+            print("Invalid year. Please enter a year like 2024.")
+            return
 
-        with open(file_path, 'r') as file:
-            for line in file:
-                name, status = line.strip().split(',')
-                
-                deleted_students = []
-                if os.path.exists(DELETED_STUDENTS_FILE):
-                    with open(DELETED_STUDENTS_FILE, "r") as del_file:
-                        deleted_students = [line.strip().lower() for line in del_file]
-                
-                if name.lower() not in deleted_students:
-                    if name not in attendance_data:
-                        attendance_data[name] = {}
-                        if idx == 0:
-                            name_order.append(name)
-
-                    attendance_data[name][date] = status
-
-    for name in attendance_data:
-        if name not in name_order:
-            name_order.append(name)
-
-    df = pd.DataFrame.from_dict(attendance_data, orient='index')
-    df.index.name = 'Student Name'
-    df = df.loc[name_order]
-    
-    # Check if the dataframe is empty
-    if df.empty:
-        print("No active student records to export for the specified month.")
+        start, end = month_bounds(int(year_input), month_number)
+        label = f"{month_input} {year_input}"
+        output_path = f"Attendance_{month_input}_{year_input}.xlsx"
+    elif export_choice == '2':
+        try:
+            start = normalize_date(input("Enter the start date (YYYY-MM-DD): "))
+            last = normalize_date(input("Enter the end date (YYYY-MM-DD): "))
+        except ValueError:
+            print("Invalid date format. Please use YYYY-MM-DD.")
+            return
+        end = next_day(last)
+        label = f"{start} to {last}"
+        output_path = f"Attendance_{start}_to_{last}.xlsx"
+    else:
+        print("Invalid choice. Please enter 1, 2 or 3.")
         return
 
-    output_path = f"Attendance_{month_input}_{year_input}.xlsx"
-    df.to_excel(output_path)
+    sheets = export_attendance_xlsx(start, end, output_path)
+    if not sheets:
+        print(f"No active student records to export for {label}.")
+        return
 
-    print(f"✅ Ordered attendance for {month_input} {year_input} exported to '{output_path}' successfully!")
+    print(f"✅ Ordered attendance for {label} exported to '{output_path}' ({sheets} sheet(s)) successfully!")
 
 def print_student_stats():
     while True:
         print("\nView and Export Student Stats:")
         print("1. All Records")
         print("2. Specific Month")
-        print("3. Back to Student Management Menu")
+        print("3. Daily Summary for a Month")
+        print("4. Date Range (a term, the last N days, or since joining)")
+        print("5. Trends and At-Risk Students")
+        print("6. Back to Student Management Menu")
         sub_choice = input("Choose an option: ").strip()
 
         if sub_choice == '1':
-            if not os.path.exists(STATS_FILE):
-                print("Master attendance file doesn't exist.")
-                return
-
             stats_data = {}
-            with open(STATS_FILE, "r") as f:
-                for line in f:
-                    name, p, a, l = line.strip().split(',')
-                    stats_data[name] = {'Presents': int(p), 'Absents': int(a), 'Leaves': int(l)}
+            for reg_num, (name, p, a, l) in load_master_stats().items():
+                stats_data[reg_num] = {'Presents': p, 'Absents': a, 'Leaves': l}
 
             students = load_students()
             
@@ -494,10 +2282,10 @@ def print_student_stats():
             for student in students:
                 name = student[0]
                 reg_num = student[3]
-                if name in stats_data:
-                    presents = stats_data[name]['Presents']
-                    absents = stats_data[name]['Absents']
-                    leaves = stats_data[name]['Leaves']
+                if reg_num in stats_data:
+                    presents = stats_data[reg_num]['Presents']
+                    absents = stats_data[reg_num]['Absents']
+                    leaves = stats_data[reg_num]['Leaves']
                     total_classes = presents + absents + leaves
                     
                     if total_classes > 0 and (total_classes - leaves) > 0:
@@ -542,49 +2330,27 @@ def print_student_stats():
                 print("Invalid month name. Please enter a full month name like 'September'.")
                 continue
 
-            monthly_stats = {}
-            students_info = {s[0]: s for s in load_students()}
-
-            if not os.path.exists(DAILY_DIR):
-                print("No daily attendance records found.")
+            if not year_input.isdigit():
+                print("Invalid year. Please enter a year like 2024.")
                 continue
 
-            files_to_process = []
-            for filename in sorted(os.listdir(DAILY_DIR)):
-                if filename.endswith('.txt'):
-                    try:
-                        file_date = datetime.datetime.strptime(filename.replace('.txt', ''), "%Y-%m-%d")
-                        if file_date.month == month_number and file_date.year == int(year_input):
-                            files_to_process.append(filename)
-                    except ValueError:
-                        continue
+            monthly_stats = {}
+            students_info = get_registry()["by_name"]
+            roster_order = {student[0].lower(): i for i, student in enumerate(load_students())}
 
-            if not files_to_process:
+            records = monthly_rollup(int(year_input), month_number)
+            if not records:
                 print(f"No attendance records found for {month_input} {year_input}.")
                 continue
 
-            for file_name in files_to_process:
-                file_path = os.path.join(DAILY_DIR, file_name)
-                with open(file_path, 'r') as file:
-                    for line in file:
-                        name, status = line.strip().split(',')
-                        name = name.strip()
-                        status = status.strip().upper()
-
-                        if name in students_info:
-                            if name not in monthly_stats:
-                                monthly_stats[name] = {'Presents': 0, 'Absents': 0, 'Leaves': 0}
-                            
-                            if status == 'P':
-                                monthly_stats[name]['Presents'] += 1
-                            elif status == 'A':
-                                monthly_stats[name]['Absents'] += 1
-                            elif status == 'L':
-                                monthly_stats[name]['Leaves'] += 1
-            
+            records.sort(key=lambda record: roster_order.get(record[0].lower(), len(roster_order)))
+            for name, presents, absents, leaves in records:
+                if name.lower() in students_info:
+                    monthly_stats[name] = {'Presents': presents, 'Absents': absents, 'Leaves': leaves}
+
             table_data = []
             for name, stats in monthly_stats.items():
-                reg_num = students_info[name][3]
+                reg_num = students_info[name.lower()][3]
                 presents = stats['Presents']
                 absents = stats['Absents']
                 leaves = stats['Leaves']
@@ -623,14 +2389,555 @@ def print_student_stats():
                 print(line)
 
         elif sub_choice == '3':
+            month_input = input("Enter the month name to view (e.g., September): ").strip().title()
+            year_input = input("Enter the year (e.g., 2024): ").strip()
+
+            try:
+                month_number = datetime.datetime.strptime(month_input, "%B").month
+            except ValueError:
+                print("Invalid month name. Please enter a full month name like 'September'.")
+                continue
+
+            if not year_input.isdigit():
+                print("Invalid year. Please enter a year like 2024.")
+                continue
+
+            dates, presents, absents, leaves, percentage = date_totals(*month_bounds(int(year_input), month_number))
+            if not len(dates):
+                print(f"No attendance records found for {month_input} {year_input}.")
+                continue
+
+            rows = [[datetime.date.fromisoformat(date).strftime('%d %b %Y'), p, a, l, f"{pct:.2f}%"]
+                    for date, p, a, l, pct in zip(dates, presents, absents, leaves, percentage)]
+            print_table(['Date', 'Presents', 'Absents', 'Leaves', 'Percentage'], rows)
+
+        elif sub_choice == '4':
+            print("\n1. Between two dates")
+            print("2. Last N days")
+            print("3. Since each student's joining date")
+            range_choice = input("Choose an option: ").strip()
+
+            today = datetime.date.today()
+            students_info = get_registry()["by_name"]
+            end = next_day(today.isoformat())
+            try:
+                if range_choice == '1':
+                    start = normalize_date(input("Enter the start date (YYYY-MM-DD): "))
+                    last = normalize_date(input("Enter the end date (YYYY-MM-DD): "))
+                    end = next_day(last)
+                    label = f"from {start} to {last}"
+                elif range_choice == '2':
+                    start = (today - datetime.timedelta(days=int(input("Enter the number of days: ")) - 1)).isoformat()
+                    label = f"since {start}"
+                elif range_choice == '3':
+                    start = None
+                    label = "since joining"
+                else:
+                    print("Invalid choice. Please enter 1, 2 or 3.")
+                    continue
+            except ValueError:
+                print("Invalid input. Use YYYY-MM-DD for dates and a whole number for days.")
+                continue
+
+            names = load_attendance_matrix()["names"]
+            if start is None:
+                start = [(students_info.get(name.lower()) or ("", "", "", "", ""))[4] for name in names]
+            names, regs, presents, absents, leaves, percentage = student_totals(start, end)
+
+            table_data = [[name, reg, p, a, l, f"{pct:.2f}%"]
+                          for name, reg, p, a, l, pct in zip(names, regs, presents, absents, leaves, percentage)
+                          if name.lower() in students_info and p + a + l > 0]
+            if not table_data:
+                print(f"No active student stats found {label}.")
+                continue
+            print_table(['Name', 'Regno', 'Presents', 'Absents', 'Leaves', 'Percentage'], table_data)
+
+        elif sub_choice == '5':
+            view_trends()
+
+        elif sub_choice == '6':
             break
         else:
-            print("Invalid choice. Please enter a number between 1 and 3.")
+            print("Invalid choice. Please enter a number between 1 and 6.")
+
+
+# --- Local dashboard: the main views as JSON over HTTP, served with asyncio ---
+# GET responses are cached until the students file, the master counters or the attendance
+# store change, and carry an ETag so polling clients get a bodiless 304 while nothing has changed.
+DASHBOARD_HOST = os.environ.get("ACADEMY_DASHBOARD_HOST", "127.0.0.1")
+DASHBOARD_PORT = int(os.environ.get("ACADEMY_DASHBOARD_PORT", "8765"))
+DASHBOARD_MAX_BODY = 1024 * 1024
+HTTP_REASONS = {200: "OK", 201: "Created", 304: "Not Modified", 400: "Bad Request", 404: "Not Found",
+                405: "Method Not Allowed", 413: "Payload Too Large", 500: "Internal Server Error"}
+_dashboard_cache = {"version": None, "responses": {}}
+
+def _data_version():
+    return (get_registry()["signature"], _file_signature(COUNTER_FILE), _db_version(get_db()))
+
+def _percentage(presents, absents, leaves):
+    counted = presents + absents
+    return round(presents * 100 / counted, 2) if counted > 0 else 0
+
+def _dashboard_student(key):
+    registry = get_registry()
+    student = registry["by_reg"].get(key.upper()) or registry["by_name"].get(key.lower())
+    if not student:
+        raise LookupError(f"No student found for {key}.")
+    return student
+
+def _student_json(student, record):
+    presents, absents, leaves = record[1:] if record else (0, 0, 0)
+    return {"name": student[0], "reg_no": student[3], "grade": student[2], "joining_date": student[4],
+            "presents": presents, "absents": absents, "leaves": leaves,
+            "percentage": _percentage(presents, absents, leaves)}
+
+def api_students(query):
+    stats = load_master_stats()
+    grade = query.get("grade")
+    return {"students": [_student_json(student, stats.get(student[3])) for student in load_students()
+                         if grade is None or same_grade(student[2], grade)]}
+
+def api_student(key, query):
+    student = _dashboard_student(key)
+    return _student_json(student, get_master_stats([student[0]]).get(student[0].lower()))
+
+def api_student_history(key, query):
+    student = _dashboard_student(key)
+    status = query.get("status", "").upper() or None
+    history = student_history_by_reg(student[3], status)
+    return {"name": student[0], "reg_no": student[3], "history": [{"date": d, "status": s} for d, s in history]}
+
+def api_dates(query):
+    return {"dates": attendance_dates()}
+
+def api_date(date, query):
+    date = normalize_date(date)
+    records = attendance_on(date)
+    if not records:
+        raise LookupError(f"No attendance recorded on {date}.")
+    return {"date": date, "attendance": [{"name": name, "status": status} for name, status in records]}
+
+def api_month(month, query):
+    parsed = datetime.datetime.strptime(month, "%Y-%m")
+    year, month_number = parsed.year, parsed.month
+    students_info = get_registry()["by_name"]
+    roster_order = {student[0].lower(): i for i, student in enumerate(load_students())}
+    records = [record for record in monthly_rollup(year, month_number) if record[0].lower() in students_info]
+    records.sort(key=lambda record: roster_order[record[0].lower()])
+    return {"month": f"{year:04}-{month_number:02}",
+            "students": [_student_json(students_info[name.lower()], (name, p, a, l)) for name, p, a, l in records]}
+
+def api_record_attendance(body):
+    data = json.loads(body or b"{}")
+    if not isinstance(data, dict) or not isinstance(data.get("statuses"), dict):
+        raise ValueError('Expected a JSON object like {"date": "YYYY-MM-DD", "statuses": {"<reg number>": "P"}}.')
+    date = normalize_date(data["date"]) if data.get("date") else datetime.date.today().isoformat()
+    entries = resolve_statuses(data["statuses"])
+    record_attendance(date, entries, send_messages=bool(data.get("send_messages", False)))
+    return {"date": date, "recorded": len(entries)}
+
+DASHBOARD_ROUTES = [
+    ("GET", ("api", "students"), api_students),
+    ("GET", ("api", "students", None), api_student),
+    ("GET", ("api", "students", None, "history"), api_student_history),
+    ("GET", ("api", "dates"), api_dates),
+    ("GET", ("api", "dates", None), api_date),
+    ("GET", ("api", "months", None), api_month),
+    ("POST", ("api", "attendance"), api_record_attendance),
+]
+
+def _json_response(status, payload, etag=None):
+    body = payload if isinstance(payload, bytes) else json.dumps(payload).encode("utf-8")
+    headers = {"Content-Type": "application/json", "Cache-Control": "no-cache"}
+    if etag:
+        headers["ETag"] = etag
+    return status, headers, body
+
+# Answer one request without any socket, so the dashboard can be driven directly by a local client.
+def handle_dashboard_request(method, target, headers=None, body=b""):
+    from urllib.parse import parse_qsl, unquote, urlsplit
+
+    headers = {key.lower(): value for key, value in (headers or {}).items()}
+    url = urlsplit(target)
+    segments = tuple(unquote(part) for part in url.path.strip("/").split("/") if part)
+    query = dict(parse_qsl(url.query))
+
+    allowed = []
+    for route_method, pattern, handler in DASHBOARD_ROUTES:
+        if len(pattern) == len(segments) and all(p is None or p == s for p, s in zip(pattern, segments)):
+            allowed.append(route_method)
+            if route_method == method:
+                break
+    else:
+        if allowed:
+            return _json_response(405, {"error": f"Use {', '.join(allowed)} for {url.path}."})
+        return _json_response(404, {"error": f"Unknown endpoint {url.path}."})
+    args = [s for p, s in zip(pattern, segments) if p is None]
+
+    try:
+        if method == "POST":
+            result = handler(*args, body)
+            _dashboard_cache.update(version=None, responses={})
+            return _json_response(201, result)
+
+        version = _data_version()
+        if version != _dashboard_cache["version"]:
+            _dashboard_cache.update(version=version, responses={})
+        cache_key = url.path.rstrip("/") + "?" + url.query
+        cached = _dashboard_cache["responses"].get(cache_key)
+        if cached is None:
+            payload = json.dumps(handler(*args, query)).encode("utf-8")
+            cached = (f'"{hashlib.sha1(payload).hexdigest()[:20]}"', payload)
+            _dashboard_cache["responses"][cache_key] = cached
+    except LookupError as error:
+        return _json_response(404, {"error": str(error.args[0]) if error.args else "Not found."})
+    except ValueError as error:
+        return _json_response(400, {"error": str(error)})
+
+    etag, payload = cached
+    if etag in [tag.strip() for tag in headers.get("if-none-match", "").split(",")]:
+        return 304, {"ETag": etag, "Cache-Control": "no-cache"}, b""
+    return _json_response(200, payload, etag)
+
+async def _serve_dashboard_connection(reader, writer, executor):
+    import asyncio
+
+    loop = asyncio.get_running_loop()
+    try:
+        while True:
+            request_line = await reader.readline()
+            if not request_line:
+                break
+            try:
+                method, target, version = request_line.decode("latin-1").split()
+            except ValueError:
+                break
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                key, _, value = line.decode("latin-1").partition(":")
+                headers[key.strip().lower()] = value.strip()
+
+            try:
+                length = int(headers.get("content-length", "0") or 0)
+            except ValueError:
+                length = -1
+            keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+            if length < 0:
+                # the body cannot be skipped without a length, so the connection is closed after replying
+                status, response_headers, body = _json_response(400, {"error": "Invalid Content-Length header."})
+                keep_alive = False
+            elif length > DASHBOARD_MAX_BODY:
+                status, response_headers, body = _json_response(413, {"error": "Request body too large."})
+                keep_alive = False
+            else:
+                request_body = await reader.readexactly(length) if length else b""
+                try:
+                    # one worker thread owns the database connection and the response cache
+                    status, response_headers, body = await loop.run_in_executor(
+                        executor, handle_dashboard_request, method, target, headers, request_body)
+                except Exception as error:
+                    status, response_headers, body = _json_response(500, {"error": str(error)})
+
+            response_headers["Content-Length"] = str(len(body))
+            response_headers["Connection"] = "keep-alive" if keep_alive else "close"
+            head = f"HTTP/1.1 {status} {HTTP_REASONS.get(status, 'OK')}\r\n"
+            head += "".join(f"{key}: {value}\r\n" for key, value in response_headers.items())
+            writer.write(head.encode("latin-1") + b"\r\n" + body)
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+async def run_dashboard(host=DASHBOARD_HOST, port=DASHBOARD_PORT):
+    import asyncio
+    import concurrent.futures
+
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="dashboard")
+    server = await asyncio.start_server(
+        lambda reader, writer: _serve_dashboard_connection(reader, writer, executor), host, port)
+    print(f"Dashboard running at http://{host}:{port}/api/students (press Ctrl+C to stop).")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        executor.shutdown(wait=True)
+
+def serve_dashboard(host=DASHBOARD_HOST, port=DASHBOARD_PORT):
+    import asyncio
+
+    recover_pending_commit()
+    start_notifier()
+    try:
+        asyncio.run(run_dashboard(host, port))
+    except KeyboardInterrupt:
+        print("Dashboard stopped.")
+
+# --- Instrumentation: per-action wall time and I/O, appended to a rotating metrics log ---
+_metrics = {"hooked": False, "active": False, "files_opened": 0}
+
+def _count_open(event, args):
+    if event == "open" and _metrics["active"]:
+        _metrics["files_opened"] += 1
+
+def _process_io():
+    # bytes moved by read()/write() calls of the whole process (Linux only)
+    try:
+        with open("/proc/self/io", "r") as file:
+            counters = dict(line.split(": ") for line in file.read().splitlines())
+        return int(counters["rchar"]), int(counters["wchar"])
+    except (OSError, KeyError, ValueError):
+        return None, None
+
+def _append_metric(record):
+    if os.path.exists(METRICS_FILE) and os.path.getsize(METRICS_FILE) >= METRICS_MAX_BYTES:
+        for i in range(METRICS_BACKUPS - 1, 0, -1):
+            if os.path.exists(f"{METRICS_FILE}.{i}"):
+                os.replace(f"{METRICS_FILE}.{i}", f"{METRICS_FILE}.{i + 1}")
+        os.replace(METRICS_FILE, f"{METRICS_FILE}.1")
+    with open(METRICS_FILE, "a") as file:
+        file.write(json.dumps(record) + "\n")
+
+def run_action(action):
+    # the maintenance scheduler waits for the menu to go idle before starting idle-only jobs
+    _scheduler["busy"] += 1
+    try:
+        if not METRICS_ENABLED:
+            return action()
+        return _measure_action(action)
+    finally:
+        _scheduler["busy"] -= 1
+        _scheduler["last_activity"] = time.monotonic()
+
+def _measure_action(action):
+    import random
+
+    if not _metrics["hooked"]:
+        sys.addaudithook(_count_open)
+        _metrics["hooked"] = True
+    profiler = None
+    if PROFILE_RATE and random.random() < PROFILE_RATE:
+        import cProfile
+
+        profiler = cProfile.Profile()
+
+    lines_before = _io_stats["lines_parsed"]
+    read_before, written_before = _process_io()
+    _metrics.update(active=True, files_opened=0)
+    start = time.perf_counter()
+    try:
+        if profiler:
+            return profiler.runcall(action)
+        return action()
+    finally:
+        elapsed = time.perf_counter() - start
+        _metrics["active"] = False
+        read_after, written_after = _process_io()
+        record = {
+            "time": datetime.datetime.now().isoformat(timespec="seconds"),
+            "action": action.__name__,
+            "wall_s": round(elapsed, 6),
+            "files_opened": _metrics["files_opened"],
+            "bytes_read": read_after - read_before if read_before is not None else None,
+            "bytes_written": written_after - written_before if written_before is not None else None,
+            "lines_parsed": _io_stats["lines_parsed"] - lines_before,
+            "profile": None,
+        }
+        if profiler:
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            record["profile"] = os.path.join(
+                PROFILE_DIR, f"{action.__name__}-{datetime.datetime.now().strftime('%Y%m%d-%H%M%S-%f')}.prof")
+            profiler.dump_stats(record["profile"])
+        _append_metric(record)
+
+def _percentile(sorted_values, percent):
+    # nearest-rank percentile
+    return sorted_values[max(0, -(-len(sorted_values) * percent // 100) - 1)]
+
+def metrics_summary():
+    durations = {}
+    io = {}
+    for path in [f"{METRICS_FILE}.{i}" for i in range(METRICS_BACKUPS, 0, -1)] + [METRICS_FILE]:
+        if not os.path.exists(path):
+            continue
+        with open(path, "r") as file:
+            for line in file:
+                if line.strip():
+                    record = json.loads(line)
+                    durations.setdefault(record["action"], []).append(record["wall_s"])
+                    totals = io.setdefault(record["action"], [0, 0])
+                    totals[0] += record["files_opened"]
+                    totals[1] += record["lines_parsed"]
+
+    if not durations:
+        print("No metrics recorded yet. Run the program with ACADEMY_METRICS=1 to collect them.")
+        return
 
+    rows = []
+    for action, values in sorted(durations.items()):
+        values.sort()
+        rows.append([action, len(values), f"{_percentile(values, 50) * 1000:.1f}", f"{_percentile(values, 95) * 1000:.1f}",
+                     f"{values[-1] * 1000:.1f}", f"{io[action][0] / len(values):.1f}", f"{io[action][1] / len(values):.0f}"])
+    print_table(["Action", "Calls", "p50 ms", "p95 ms", "Max ms", "Files/call", "Lines/call"], rows)
+
+# --- Maintenance scheduler: backups, exports and cache warmup in the background ---
+# Jobs run from one daemon thread (or the foreground in daemon mode). Backup and export take the
+# data lock without waiting, only long enough to copy the database, and do the slow work from the
+# copy; if attendance is being saved the job returns None and is retried on the next poll. Warmup
+# does the same while it refreshes the registry, search index and counter map, which other threads
+# read without a lock. Every run is appended to a history file.
+MAINTENANCE_JOBS = {
+    "warmup": {"every_minutes": 60, "when_idle": True},
+    "backup": {"every_minutes": 24 * 60, "when_idle": True},
+    "export": {"every_minutes": 24 * 60, "when_idle": True},
+}
+_scheduler = {"thread": None, "stop": threading.Event(), "busy": 0, "last_activity": time.monotonic(),
+              "last_runs": None}
+
+def warm_caches():
+    with data_lock(blocking=False) as acquired:
+        if not acquired:
+            return None
+        get_search_index()
+        get_counters()
+    attendance_dates()
+    try:
+        load_attendance_matrix()
+    except ImportError:
+        return "registry and counters (numpy is not installed)"
+    return "registry, search index, counters and attendance matrix"
+
+def maintenance_backup():
+    result = create_snapshot(blocking=False)
+    if result is None:
+        return None
+    snapshot_id, stats = result
+    return f"snapshot {snapshot_id}, {stats['chunks']} new chunk(s)"
+
+def maintenance_export():
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    path = os.path.join(EXPORT_DIR, "Attendance_history.csv")
+    copy_path = os.path.join(EXPORT_DIR, "attendance_copy.db")
+    with data_lock(blocking=False) as acquired:
+        if not acquired:
+            return None
+        _copy_database(copy_path)
+        export_master_stats(os.path.join(EXPORT_DIR, "master_attendance.txt"))
+    conn = sqlite3.connect(copy_path)
+    try:
+        rows = export_attendance_history(path + ".tmp", conn=conn)
+    finally:
+        conn.close()
+        os.remove(copy_path)
+    os.replace(path + ".tmp", path)
+    return f"{rows} row(s) to {path}"
+
+MAINTENANCE_ACTIONS = {"warmup": warm_caches, "backup": maintenance_backup, "export": maintenance_export}
+
+def load_maintenance_config():
+    # maintenance.json may override any job, e.g. {"backup": {"every_minutes": 360}, "export": {"enabled": false}}
+    config = {name: dict(job) for name, job in MAINTENANCE_JOBS.items()}
+    if os.path.exists(MAINTENANCE_CONFIG_FILE):
+        with open(MAINTENANCE_CONFIG_FILE, "r") as file:
+            for name, overrides in json.load(file).items():
+                if name in config:
+                    config[name].update(overrides)
+    return config
+
+def maintenance_history():
+    history = []
+    if os.path.exists(MAINTENANCE_HISTORY_FILE):
+        with open(MAINTENANCE_HISTORY_FILE, "r") as file:
+            history = [json.loads(line) for line in file if line.strip()]
+    return history
+
+def _record_maintenance_run(record):
+    with open(MAINTENANCE_HISTORY_FILE, "a") as file:
+        file.write(json.dumps(record) + "\n")
+    if os.path.getsize(MAINTENANCE_HISTORY_FILE) > MAINTENANCE_HISTORY_KEEP * 400:
+        write_file_atomic(MAINTENANCE_HISTORY_FILE,
+                          [json.dumps(entry) + "\n" for entry in maintenance_history()[-MAINTENANCE_HISTORY_KEEP:]])
+
+def run_due_jobs(idle=None, force=False):
+    if _scheduler["last_runs"] is None:
+        _scheduler["last_runs"] = {entry["job"]: entry["started_at"] for entry in maintenance_history()}
+    if idle is None:
+        idle = not _scheduler["busy"] and time.monotonic() - _scheduler["last_activity"] >= MAINTENANCE_IDLE
+
+    records = []
+    now = time.time()
+    for name, job in load_maintenance_config().items():
+        last_run = _scheduler["last_runs"].get(name)
+        due = force or last_run is None or now - last_run >= job["every_minutes"] * 60
+        if not job.get("enabled", True) or not due or (job.get("when_idle", True) and not idle and not force):
+            continue
+        started_at = time.time()
+        start = time.perf_counter()
+        try:
+            detail = MAINTENANCE_ACTIONS[name]()
+            if detail is None:
+                continue  # attendance is being saved; try again on the next poll
+            record = {"job": name, "status": "ok", "detail": detail}
+        except Exception as error:
+            record = {"job": name, "status": "failed", "detail": f"{type(error).__name__}: {error}"}
+        record.update(started_at=started_at, duration_s=round(time.perf_counter() - start, 3),
+                      started=datetime.datetime.fromtimestamp(started_at).isoformat(timespec="seconds"))
+        _scheduler["last_runs"][name] = started_at
+        _record_maintenance_run(record)
+        records.append(record)
+    return records
+
+def _scheduler_loop():
+    while not _scheduler["stop"].wait(MAINTENANCE_POLL):
+        run_due_jobs()
+
+def start_scheduler():
+    if _scheduler["thread"] is None:
+        _scheduler["stop"].clear()
+        _scheduler["thread"] = threading.Thread(target=_scheduler_loop, daemon=True)
+        _scheduler["thread"].start()
+
+def stop_scheduler():
+    if _scheduler["thread"] is not None:
+        _scheduler["stop"].set()
+        _scheduler["thread"].join()
+        _scheduler["thread"] = None
+
+def run_maintenance_daemon():
+    # nobody is at this terminal, so every due job counts as idle
+    recover_pending_commit()
+    jobs = [name for name, job in load_maintenance_config().items() if job.get("enabled", True)]
+    print(f"Maintenance daemon running ({', '.join(jobs)}); press Ctrl+C to stop.")
+    try:
+        while True:
+            for record in run_due_jobs(idle=True):
+                print(f"[{record['started']}] {record['job']}: {record['status']} "
+                      f"({record['duration_s']:.1f}s) {record['detail']}")
+            time.sleep(MAINTENANCE_POLL)
+    except KeyboardInterrupt:
+        print("Maintenance daemon stopped.")
+
+def view_maintenance_history():
+    history = maintenance_history()
+    if not history:
+        print("No maintenance jobs have run yet.")
+        return
+    print_table(["Started", "Job", "Status", "Seconds", "Detail"],
+                [[entry["started"], entry["job"], entry["status"], f"{entry['duration_s']:.1f}", entry["detail"]]
+                 for entry in history[-20:]])
 
 # --- Main menu ---
 def main():
     print("Welcome to My Academy Attendance System")
+    recover_pending_commit()
+    start_notifier()
+    if MAINTENANCE_ENABLED:
+        start_scheduler()
 
     while True:
         print("\nMenu:")
@@ -639,7 +2946,8 @@ def main():
         print("3. Backup")
         print("4. View and Edit Attendance Records")
         print("5. Copy to Excel file")
-        print("6. Exit")
+        print("6. WhatsApp message outbox")
+        print("7. Exit")
 
         choice = input("Choose an option: ").strip()
         if not choice.isdigit():
@@ -654,72 +2962,102 @@ def main():
                 print("3. View student attendance stats (Specific Student)")
                 print("4. View date-wise attendance for a student")
                 print("5. View Student Stats (Table Format)")
-                print("6. Back to Main Menu")
+                print("6. Import students from a CSV/Excel roster")
+                print("7. Back to Main Menu")
                 
                 sub_choice = input("Choose an option: ").strip()
                 if sub_choice == '1':
-                    add_student()
+                    run_action(add_student)
                 elif sub_choice == '2':
-                    delete_student()
+                    run_action(delete_student)
                 elif sub_choice == '3':
-                    view_student_stats()
+                    run_action(view_student_stats)
                 elif sub_choice == '4':
-                    view_attendance_by_date()
+                    run_action(view_attendance_by_date)
                 elif sub_choice == '5':
-                    print_student_stats()
+                    run_action(print_student_stats)
                 elif sub_choice == '6':
+                    run_action(import_students_menu)
+                elif sub_choice == '7':
                     break
                 else:
-                    print("Invalid choice. Please enter a number between 1 and 6.")
+                    print("Invalid choice. Please enter a number between 1 and 7.")
 
         elif choice == '2':
-            take_attendance()
+            run_action(take_attendance)
         elif choice == '3':
             while True:
                 print("\nBackup:")
                 print("1. Create Backup")
                 print("2. Restore from Backup")
-                print("3. Back to Main Menu")
+                print("3. View background maintenance history")
+                print("4. Back to Main Menu")
 
                 sub_choice = input("Choose an option: ").strip()
                 if sub_choice == '1':
-                    create_backup()
+                    run_action(create_backup)
                 elif sub_choice == '2':
-                    restore_backup()
+                    run_action(restore_backup)
                 elif sub_choice == '3':
+                    run_action(view_maintenance_history)
+                elif sub_choice == '4':
                     break
                 else:
-                    print("Invalid choice. Please enter a number between 1 and 3.")
+                    print("Invalid choice. Please enter a number between 1 and 4.")
 
         elif choice == '4':
             while True:
                 print("\nView and Edit Attendance:")
                 print("1. View attendance of a specific date")
                 print("2. Edit attendance record for a date")
-                print("3. Back to Main Menu")
+                print("3. Check master stats against attendance history")
+                print("4. Archive deleted students and closed years")
+                print("5. View archived attendance for a student")
+                print("6. Back to Main Menu")
 
                 sub_choice = input("Choose an option: ").strip()
                 if sub_choice == '1':
-                    view_attendance_on_specific_date()
+                    run_action(view_attendance_on_specific_date)
                 elif sub_choice == '2':
-                    edit_attendance_record()
+                    run_action(edit_attendance_record)
                 elif sub_choice == '3':
+                    run_action(check_master_stats)
+                elif sub_choice == '4':
+                    run_action(archive_data_menu)
+                elif sub_choice == '5':
+                    run_action(view_archived_attendance)
+                elif sub_choice == '6':
                     break
                 else:
-                    print("Invalid choice. Please enter a number between 1 and 3.")
+                    print("Invalid choice. Please enter a number between 1 and 6.")
 
         elif choice == '5':
-            txt_to_xls()
+            run_action(txt_to_xls)
         elif choice == '6':
-            print("Goodbye! Exiting program.")
+            run_action(view_notifications)
+        elif choice == '7':
             break
         else:
-            print("Invalid choice! Please enter a number between 1 and 6.")
+            print("Invalid choice! Please enter a number between 1 and 7.")
 
         continue_menu = input("\nDo you want to go back to the main menu? (y/n): ").lower()
         if continue_menu != 'y':
-            print("Goodbye! Exiting program.")
             break
 
+    stop_scheduler()
+    with data_lock():
+        export_master_stats()
+    queued = len(pending_notifications())
+    if queued:
+        print(f"{queued} WhatsApp message(s) are still queued and will be sent the next time the program runs.")
+    print("Goodbye! Exiting program.")
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    if sys.argv[1:2] == ["serve"]:
+        serve_dashboard()
+    elif sys.argv[1:2] == ["metrics"]:
+        metrics_summary()
+    elif sys.argv[1:2] == ["daemon"]:
+        run_maintenance_daemon()
+    else:
+        main()
\ No newline at end of file
@@ -0,0 +1,326 @@
+import argparse
+import builtins
+import contextlib
+import datetime
+import json
+import multiprocessing
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import types
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, SCRIPT_DIR)
+import MyAcademy_Script as academy
+
+# --- Write a synthetic roster into the current directory ---
+def write_roster(size):
+    with open(academy.STUDENT_FILE, "w") as file:
+        for i in range(size):
+            file.write(f"Student {i},0300{i:07},{i % 10 + 1},MA25{i % 10 + 1:02}{i + 1:02},2025-01-01\n")
+    with open(academy.STATS_FILE, "w") as file:
+        for i in range(size):
+            file.write(f"Student {i},0,0,0\n")
+
+# --- take_attendance() scaling: time one non-interactive session per roster size ---
+def bench_take_attendance(sizes=(5000, 50000)):
+    results = []
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as workdir:
+            os.chdir(workdir)
+            write_roster(size)
+            statuses = {f"Student {i}": "PPPPPPPPLA"[i % 10] for i in range(size)}
+            start = time.perf_counter()
+            academy.take_attendance(statuses, date="2025-09-01")
+            elapsed = time.perf_counter() - start
+            academy.close_db()
+            results.append((size, elapsed))
+    return results
+
+# --- Startup time: import the script in a fresh interpreter with -X importtime ---
+# "cold" runs against an empty bytecode cache, "warm" reuses the cache the cold run wrote.
+def _import_once(pycache_dir):
+    env = dict(os.environ, PYTHONPYCACHEPREFIX=pycache_dir)
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import MyAcademy_Script"],
+                            cwd=SCRIPT_DIR, env=env, capture_output=True, text=True, check=True)
+    elapsed = time.perf_counter() - start
+
+    imports = []
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line and "self [us]" not in line:
+            self_us, cumulative_us, name = line[len("import time:"):].split("|")
+            imports.append((int(cumulative_us), name.rstrip()))
+    module_us = next((us for us, name in imports if name.strip() == "MyAcademy_Script"), 0)
+    return elapsed, module_us, imports
+
+def bench_startup(warm_runs=5):
+    with tempfile.TemporaryDirectory() as pycache_dir:
+        cold = _import_once(pycache_dir)
+        warm = [_import_once(pycache_dir) for _ in range(warm_runs)]
+    return cold, min(warm, key=lambda run: run[0])
+
+# --- Concurrency stress test: many processes recording the same dates at once ---
+def _stress_worker(workdir, grade, dates, seed):
+    os.chdir(workdir)
+    rng = random.Random(seed)
+    roster = [s for s in academy.load_students() if s[2] == str(grade)]
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for date in dates:
+            academy.take_attendance({s[3]: rng.choice("PPPAL") for s in roster}, date=date)
+            # re-record part of the grade to exercise replace-on-rerecord
+            academy.take_attendance({s[3]: rng.choice("PAL") for s in roster[:5]}, date=date)
+
+def stress_concurrent_sessions(processes=8, students_per_grade=50, days=10):
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        try:
+            with open(academy.STUDENT_FILE, "w") as file, open(academy.STATS_FILE, "w") as stats:
+                for grade in range(1, processes + 1):
+                    for i in range(students_per_grade):
+                        name = f"Student {grade}-{i}"
+                        file.write(f"{name},0300,{grade},MA25{grade:02}{i + 1:02},2025-01-01\n")
+                        stats.write(f"{name},0,0,0\n")
+            dates = [f"2025-09-{day + 1:02}" for day in range(days)]
+
+            start = time.perf_counter()
+            workers = [multiprocessing.Process(target=_stress_worker, args=(workdir, grade, dates, grade))
+                       for grade in range(1, processes + 1)]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+            elapsed = time.perf_counter() - start
+
+            drift = academy.reconcile_master_stats()
+            rows = academy.get_db().execute("SELECT COUNT(*) FROM attendance").fetchone()[0]
+            academy.close_db()
+        finally:
+            os.chdir(cwd)
+    expected_rows = processes * students_per_grade * days
+    return {
+        "processes": processes,
+        "elapsed_s": round(elapsed, 3),
+        "failed_workers": sum(worker.exitcode != 0 for worker in workers),
+        "attendance_rows": rows,
+        "expected_rows": expected_rows,
+        "students_with_drift": len(drift),
+        "ok": rows == expected_rows and not drift and all(worker.exitcode == 0 for worker in workers),
+    }
+
+# --- Archive regression check: closed years, then a deleted student, must leave no drift ---
+def check_archive_compaction():
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        try:
+            with open(academy.STUDENT_FILE, "w") as file:
+                file.write("Ali Khan,0300,5,MA220501,2022-01-01\nSara,0301,5,MA220502,2022-01-01\n")
+            with open(academy.STATS_FILE, "w") as file:
+                file.write("Ali Khan,0,0,0\nSara,0,0,0\n")
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                for date in ["2022-03-01", "2022-03-02", "2023-03-01"]:
+                    academy.take_attendance({"MA220501": "P", "MA220502": "A"}, date=date)
+                academy.compact_data(2022)
+                closed_year_drift = academy.reconcile_master_stats()
+                with open(academy.DELETED_STUDENTS_FILE, "a") as file:
+                    file.write("MA220501\n")
+                academy.compact_data()
+                deleted_drift = academy.reconcile_master_stats()
+                _, history = academy.archived_history("MA220501")
+                # a new student enrolled under a deleted student's name keeps their own counts
+                with open(academy.DELETED_STUDENTS_FILE, "a") as file:
+                    file.write("MA220502\n")
+                with academy.data_lock():
+                    with open(academy.STUDENT_FILE, "a") as file:
+                        file.write("Sara,0302,5,MA230502,2023-03-02\n")
+                    academy.add_counters([("MA230502", "Sara", 0, 0, 0)])
+                academy.take_attendance({"MA230502": "P"}, date="2023-03-02")
+                academy.compact_data()
+                shared_name_stats = academy.load_master_stats().get("MA230502")
+                shared_name_drift = academy.reconcile_master_stats()
+            academy.close_db()
+            academy.close_counters()
+        finally:
+            os.chdir(cwd)
+    return {
+        "closed_year_drift": closed_year_drift,
+        "deleted_student_drift": deleted_drift,
+        "archived_rows": len(history),
+        "shared_name_stats": shared_name_stats,
+        "shared_name_drift": shared_name_drift,
+        "ok": (not closed_year_drift and not deleted_drift and len(history) == 3
+               and shared_name_stats == ["Sara", 1, 0, 0] and not shared_name_drift),
+    }
+
+# --- Synthetic academy: students, master stats, deleted students and a daily_attendance/ tree ---
+FIRST_NAMES = ["Ahmed", "Ali", "Ayesha", "Bilal", "Fatima", "Hamza", "Hassan", "Hira", "Ibrahim", "Iqra",
+               "Kashif", "Laiba", "Maryam", "Mehwish", "Muhammad", "Noor", "Omar", "Rabia", "Saad", "Sana",
+               "Sara", "Shahid", "Sidra", "Talha", "Usman", "Zainab", "Zara", "Zubair", "Asad", "Huma"]
+LAST_NAMES = ["Khan", "Ahmed", "Ali", "Butt", "Chaudhry", "Malik", "Qureshi", "Raza", "Shah", "Siddiqui",
+              "Akhtar", "Baig", "Hussain", "Iqbal", "Javed", "Mirza", "Naqvi", "Rana", "Sheikh", "Zafar"]
+GENERATOR_END_DATE = datetime.date(2025, 6, 30)
+
+def generate_academy(students, years, seed=0, deleted_fraction=0.02, end_date=GENERATOR_END_DATE):
+    # Writes the legacy text layout into the current directory; the script migrates it on first use.
+    rng = random.Random(seed)
+    start_date = end_date - datetime.timedelta(days=365 * years)
+    combos = len(FIRST_NAMES) * len(LAST_NAMES)
+    sequences = {}
+    roster = []
+    for i in range(students):
+        name = f"{FIRST_NAMES[i % len(FIRST_NAMES)]} {LAST_NAMES[i // len(FIRST_NAMES) % len(LAST_NAMES)]}"
+        if i >= combos:
+            name += f" {i // combos + 1}"
+        grade = rng.randint(1, 10)
+        year = start_date.year % 100
+        sequences[grade] = sequences.get(grade, 0) + 1
+        reg_num = f"MA{year:02}{grade:02}{sequences[grade]:02}"
+        # a per-student attendance rate, so some students drift towards the at-risk threshold
+        roster.append((name, f"03{rng.randint(0, 999999999):09}", grade, reg_num, start_date.isoformat(),
+                       rng.uniform(0.7, 0.99)))
+
+    with open(academy.STUDENT_FILE, "w") as file:
+        for name, phone, grade, reg_num, joining_date, _ in roster:
+            file.write(f"{name},{phone},{grade},{reg_num},{joining_date}\n")
+    with open(academy.DELETED_STUDENTS_FILE, "w") as file:
+        for _, _, _, reg_num, _, _ in rng.sample(roster, int(students * deleted_fraction)):
+            file.write(f"{reg_num}\n")
+
+    totals = [[0, 0, 0] for _ in roster]
+    days = 0
+    os.makedirs(academy.DAILY_DIR, exist_ok=True)
+    date = start_date
+    while date <= end_date:
+        if date.weekday() < 5:
+            lines = []
+            for i, (name, *_, rate) in enumerate(roster):
+                roll = rng.random()
+                status = 0 if roll < rate else (1 if roll < rate + (1 - rate) * 0.7 else 2)
+                totals[i][status] += 1
+                lines.append(f"{name},{'PAL'[status]}\n")
+            with open(os.path.join(academy.DAILY_DIR, f"{date.isoformat()}.txt"), "w") as file:
+                file.writelines(lines)
+            days += 1
+        date += datetime.timedelta(days=1)
+
+    with open(academy.STATS_FILE, "w") as file:
+        for (name, *_), (p, a, l) in zip(roster, totals):
+            file.write(f"{name},{p},{a},{l}\n")
+    return {"students": students, "years": years, "days": days, "attendance_rows": days * students}
+
+# --- Benchmark harness: drive the interactive functions with scripted input() answers ---
+_file_opens = {"active": False, "count": 0}
+
+def _count_file_opens(event, args):
+    if event == "open" and _file_opens["active"]:
+        _file_opens["count"] += 1
+
+def _scripted_input(answers, default):
+    answers = iter(answers)
+    return lambda prompt="": next(answers, default)
+
+def measure(function, answers=(), default="6"):
+    original_input = builtins.input
+    builtins.input = _scripted_input(answers, default)
+    tracemalloc.start()
+    _file_opens.update(active=True, count=0)
+    try:
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            start = time.perf_counter()
+            function()
+            elapsed = time.perf_counter() - start
+    finally:
+        _file_opens["active"] = False
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        builtins.input = original_input
+    return {"wall_s": round(elapsed, 4), "peak_mb": round(peak / 2 ** 20, 2), "file_opens": _file_opens["count"]}
+
+def run_suite(students, years, seed=0):
+    if not _file_opens.get("hooked"):
+        sys.addaudithook(_count_file_opens)
+        _file_opens["hooked"] = True
+    # never reach WhatsApp: stub the module and hand the notifier a sender that only counts
+    sys.modules["pywhatkit"] = types.SimpleNamespace(sendwhatmsg_instantly=lambda *args, **kwargs: None)
+    sent = []
+    academy.start_notifier(sender=lambda phone, message: sent.append(phone))
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        try:
+            start = time.perf_counter()
+            generated = generate_academy(students, years, seed)
+            generated["generate_s"] = round(time.perf_counter() - start, 3)
+
+            active = academy.load_students()
+            sample = random.Random(seed).sample(active, min(5, len(active)))
+            last = max(os.listdir(academy.DAILY_DIR))[:-4]
+            month = datetime.date.fromisoformat(last)
+            next_date = academy.next_day(last)
+
+            scenarios = [
+                # first touch migrates the text files into the attendance store and the counter file
+                ("first_load", lambda: (academy.attendance_dates(), academy.load_master_stats()), ()),
+                ("take_attendance", academy.take_attendance,
+                 ["Y", next_date, "", "2"] + [f"{student[3]} A" for student in sample] + ["done"]),
+                ("view_attendance_by_date", academy.view_attendance_by_date, [sample[0][3], "1"]),
+                ("print_student_stats", academy.print_student_stats,
+                 ["1", "2", month.strftime("%B"), str(month.year), "6"]),
+                ("txt_to_xls", academy.txt_to_xls, ["1", month.strftime("%B"), str(month.year)]),
+                ("create_backup", academy.create_backup, ()),
+            ]
+            results = {name: measure(function, answers) for name, function, answers in scenarios}
+            academy.close_db()
+            academy.close_counters()
+        finally:
+            os.chdir(cwd)
+
+    return {"python": platform.python_version(), "seed": seed, **generated, "results": results}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="MyAcademy attendance benchmarks")
+    parser.add_argument("benchmark", nargs="?", choices=["attendance", "startup", "stress", "suite", "archive"], default="attendance")
+    parser.add_argument("--students", type=int, nargs="+", default=[500, 5000], help="suite roster sizes")
+    parser.add_argument("--years", type=int, nargs="+", default=[1], help="suite history lengths in years")
+    parser.add_argument("--seed", type=int, default=0, help="suite data generator seed")
+    parser.add_argument("--output", help="also write the suite results as JSON to this file")
+    args = parser.parse_args()
+
+    cwd = os.getcwd()
+    if args.benchmark == "attendance":
+        try:
+            results = bench_take_attendance()
+        finally:
+            os.chdir(cwd)
+        for size, elapsed in results:
+            print(f"take_attendance: {size:>6} students  {elapsed:.3f}s  ({elapsed / size * 1e6:.1f} us/student)")
+    elif args.benchmark == "suite":
+        runs = [run_suite(students, years, args.seed) for students in args.students for years in args.years]
+        print(json.dumps(runs, indent=2))
+        if args.output:
+            with open(args.output, "w") as file:
+                json.dump(runs, file, indent=2)
+    elif args.benchmark == "archive":
+        result = check_archive_compaction()
+        print(result)
+        sys.exit(0 if result["ok"] else 1)
+    elif args.benchmark == "stress":
+        result = stress_concurrent_sessions()
+        print(result)
+        sys.exit(0 if result["ok"] else 1)
+    else:
+        cold, warm = bench_startup()
+        for label, (elapsed, module_us, imports) in (("cold", cold), ("warm", warm)):
+            print(f"startup ({label}): process {elapsed * 1000:.0f} ms, import MyAcademy_Script {module_us / 1000:.1f} ms")
+        print("slowest top-level imports (warm):")
+        top_level = [(us, name.strip()) for us, name in warm[2] if not name.startswith("  ")]
+        for us, name in sorted(top_level, reverse=True)[:5]:
+            print(f"  {name:<30} {us / 1000:.1f} ms")